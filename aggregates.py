@@ -0,0 +1,373 @@
+import heapq
+
+import pandas as pd
+
+# Incrementally maintained aggregates over the processed payments frame.
+#
+# Every table maps a key tuple to [row count, *sums]. A batch of rows is folded in
+# with sign=+1 and its previous version retracted with sign=-1, so an update only
+# touches the months, countries, customers and cohort cells present in the batch.
+#
+# Ranked dimensions (countries, decline reasons) are kept per (Source, category)
+# slice, including the ALL roll-ups, as {value: [count, sum]} so a top-K query reads
+# one slice and never scans rows.
+
+SUCCESS_STATUSES = ("Paid", "Refunded", "Partial Refund")
+
+LEDGER_KEYS = ["Source", "Adspends / Subscription", "Month", "Status"]
+LEDGER_VALUES = ["Converted Amount", "Converted Amount Refunded", "Fee", "Disputed Amount"]
+
+# Slice key standing for every Source or every category
+ALL = "__all__"
+OTHER = "Other"
+RANKED_DIMENSIONS = {
+    "countries": ("Card Address Country", "Converted Amount"),
+    "declines": ("Decline Reason", None)
+}
+
+CUSTOMER_KEYS = ["Customer Email"]
+CUSTOMER_VALUES = [
+    "Converted Amount", "Successful Amount", "Converted Amount Refunded", "Disputed Amount",
+    "Successful Adspends", "Successful Adspends Amount",
+    "Successful Subscriptions", "Successful Subscriptions Amount"
+]
+
+
+def _clean_key(key):
+    if not isinstance(key, tuple):
+        key = (key,)
+    return tuple(None if pd.isna(part) else part for part in key)
+
+
+def _accumulate(table, df, keys, values, sign):
+    if df.empty:
+        return
+    grouped = df.groupby(keys, dropna=False, sort=False)
+    counts = grouped.size()
+    sums = grouped[values].sum().reindex(counts.index).values if values else None
+
+    for i, (key, count) in enumerate(counts.items()):
+        key = _clean_key(key)
+        cell = table.get(key)
+        if cell is None:
+            cell = table[key] = [0] * (1 + len(values))
+        cell[0] += sign * int(count)
+        if cell[0] <= 0:
+            # Last contributing row retracted: drop the cell so float drift cannot linger
+            del table[key]
+            continue
+        for j in range(len(values)):
+            cell[j + 1] += sign * float(sums[i, j])
+
+
+def _accumulate_ranked(slices, df, column, value_column, sign):
+    if df.empty:
+        return
+    grouped = df.groupby(["Source", "Adspends / Subscription", column], dropna=False, sort=False)
+    counts = grouped.size()
+    sums = grouped[value_column].sum().values if value_column else None
+
+    for i, (key, count) in enumerate(counts.items()):
+        source, category, value = _clean_key(key)
+        total = float(sums[i]) if value_column else 0.0
+        for slice_key in ((source, category), (source, ALL), (ALL, category), (ALL, ALL)):
+            cells = slices.setdefault(slice_key, {})
+            cell = cells.get(value)
+            if cell is None:
+                cell = cells[value] = [0, 0.0]
+            cell[0] += sign * int(count)
+            if cell[0] <= 0:
+                del cells[value]
+                if not cells:
+                    del slices[slice_key]
+                continue
+            cell[1] += sign * total
+
+
+def _failed_mask(df):
+    return ~df["Status"].isin(SUCCESS_STATUSES)
+
+
+def _customer_rows(df):
+    paid = df["Status"] == "Paid"
+    adspends = paid & (df["Adspends / Subscription"] == "Adspends")
+    subscriptions = paid & (df["Adspends / Subscription"] == "Subscription")
+    return pd.DataFrame({
+        "Customer Email": df["Customer Email"],
+        "Converted Amount": df["Converted Amount"],
+        "Successful Amount": df["Converted Amount"].where(paid, 0),
+        "Converted Amount Refunded": df["Converted Amount Refunded"],
+        "Disputed Amount": df["Disputed Amount"],
+        "Successful Adspends": adspends.astype(int),
+        "Successful Adspends Amount": df["Converted Amount"].where(adspends, 0),
+        "Successful Subscriptions": subscriptions.astype(int),
+        "Successful Subscriptions Amount": df["Converted Amount"].where(subscriptions, 0)
+    })
+
+
+def _customer_months(df):
+    rows = df[df["Customer Email"].notna() & (df["Month"] != "NaT")]
+    return rows.groupby(["Customer Email", "Month"], sort=False).size()
+
+
+def _cohort_cells(months):
+    # A customer's cohort is their first month; they count once in every month they paid
+    if not months:
+        return []
+    cohort = min(months)
+    return [(cohort, month) for month in months]
+
+
+def _apply(aggregates, df, sign):
+    _accumulate(aggregates["ledger"], df, LEDGER_KEYS, LEDGER_VALUES, sign)
+    _accumulate_ranked(aggregates["countries"], df, "Card Address Country", "Converted Amount", sign)
+    failed = df[_failed_mask(df) & df["Decline Reason"].notna()]
+    _accumulate_ranked(aggregates["declines"], failed, "Decline Reason", None, sign)
+    _accumulate(aggregates["customers"], _customer_rows(df), CUSTOMER_KEYS, CUSTOMER_VALUES, sign)
+
+
+def _apply_customer_months(aggregates, retracted, added):
+    customer_months = aggregates["customer_months"]
+    cohort_cells = aggregates["cohort_cells"]
+
+    deltas = {}
+    for sign, counts in ((-1, retracted), (1, added)):
+        for (email, month), count in counts.items():
+            deltas.setdefault(email, {}).setdefault(month, 0)
+            deltas[email][month] += sign * int(count)
+
+    for email, month_deltas in deltas.items():
+        months = customer_months.get(email, {})
+        for cell in _cohort_cells(months):
+            cohort_cells[cell] -= 1
+            if cohort_cells[cell] == 0:
+                del cohort_cells[cell]
+
+        months = dict(months)
+        for month, delta in month_deltas.items():
+            months[month] = months.get(month, 0) + delta
+            if months[month] <= 0:
+                del months[month]
+
+        if months:
+            customer_months[email] = months
+        else:
+            customer_months.pop(email, None)
+        for cell in _cohort_cells(months):
+            cohort_cells[cell] = cohort_cells.get(cell, 0) + 1
+
+
+def build_aggregates(df):
+    aggregates = {
+        "ledger": {},
+        "countries": {},
+        "declines": {},
+        "customers": {},
+        "customer_months": {},
+        "cohort_cells": {}
+    }
+    _apply(aggregates, df, 1)
+    _apply_customer_months(aggregates, pd.Series(dtype=int), _customer_months(df))
+    return aggregates
+
+
+def update_aggregates(aggregates, old_rows, new_rows):
+    # Retract the previous version of changed payments, then fold in the new rows
+    _apply(aggregates, old_rows, -1)
+    _apply(aggregates, new_rows, 1)
+    _apply_customer_months(aggregates, _customer_months(old_rows), _customer_months(new_rows))
+
+
+def _table_frame(table, keys, values, source=None):
+    frame = pd.DataFrame(
+        [key + tuple(cell) for key, cell in list(table.items())],
+        columns=keys + ["count"] + values
+    )
+    if source is not None and "Source" in keys:
+        frame = frame[frame["Source"] == source]
+    return frame
+
+
+def ledger_frame(aggregates, source=None):
+    return _table_frame(aggregates["ledger"], LEDGER_KEYS, LEDGER_VALUES, source)
+
+
+def top_k(aggregates, dimension, k, source=None, category=None):
+    # The k largest values of a ranked dimension in one slice, with everything else
+    # folded into an "Other" row; countries rank by amount, decline reasons by count
+    column, value_column = RANKED_DIMENSIONS[dimension]
+    cells = aggregates[dimension].get((source or ALL, category or ALL), {})
+    rank = 1 if value_column else 0
+    ranked = [(value, cell) for value, cell in list(cells.items()) if value is not None]
+    top = heapq.nlargest(k, ranked, key=lambda item: (item[1][rank], item[1][0]))
+
+    rows = [(value, cell[0], cell[1], 1) for value, cell in top]
+    if len(ranked) > len(top):
+        shown = {value for value, _ in top}
+        rest = [cell for value, cell in ranked if value not in shown]
+        rows.append((OTHER, sum(cell[0] for cell in rest), sum(cell[1] for cell in rest), len(rest)))
+
+    frame = pd.DataFrame(rows, columns=[column, "count", value_column or "sum", "values"])
+    return frame if value_column else frame.drop(columns="sum")
+
+
+def customer_totals(aggregates, email):
+    cell = aggregates["customers"].get((email,))
+    if cell is None:
+        return None
+    return dict(zip(["count"] + CUSTOMER_VALUES, cell))
+
+
+def cohort_frame(aggregates):
+    return pd.DataFrame(
+        [(cohort, month, n) for (cohort, month), n in list(aggregates["cohort_cells"].items())],
+        columns=["cohort", "sub_month", "n_customers"]
+    )
+
+
+# Ad-hoc aggregation: group by any of the dimensions below (plus an optional time grain
+# over Created date) and compute sum/count/mean/nunique metrics in one groupby pass.
+
+QUERY_DIMENSIONS = [
+    "Source", "Status", "Adspends / Subscription", "Card Address Country", "Currency",
+    "Decline Reason", "Dispute Status", "Dispute Reason", "Captured", "Customer Email", "Customer ID", "Month"
+]
+QUERY_METRIC_COLUMNS = [
+    "Amount", "Amount Refunded", "Gateway charges in USD", "Overages in USD", "Converted Amount",
+    "Converted Amount Refunded", "Fee", "Taxes On Fee", "Disputed Amount"
+]
+QUERY_AGGREGATIONS = ["sum", "count", "mean", "nunique"]
+QUERY_GRAINS = {"day": "D", "week": "W", "month": "M", "quarter": "Q", "year": "Y"}
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return list(value)
+
+
+def parse_query_date(values, name):
+    # values is any mapping with .get, e.g. a query spec or request.args
+    value = values.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError, OverflowError):
+        timestamp = pd.NaT
+    if pd.isna(timestamp):
+        raise ValueError(f"Invalid {name} date: {value}")
+    # Created dates are naive UTC, so aware bounds are converted to naive UTC
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.isoformat()
+
+
+def _column_kind(series):
+    # Boolean columns with blanks load as object; treat them as boolean too
+    if series.dtype.kind == "O" and pd.api.types.infer_dtype(series, skipna=True) == "boolean":
+        return "b"
+    return series.dtype.kind
+
+
+def _coerce_filter_value(column, value, kind):
+    # Query-string filters arrive as text; match them to the column's type
+    if value is None or kind is None:
+        return value
+    if kind == "b":
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in ("true", "1", "yes"):
+            return True
+        if text in ("false", "0", "no"):
+            return False
+        raise ValueError(f"Invalid value for {column}: {value} (expected true or false)")
+    if kind in "iuf":
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {column}: {value} (expected a number)")
+        return int(number) if kind in "iu" and number.is_integer() else number
+    return str(value)
+
+
+def normalize_query(spec, df=None):
+    # df, when given, is the frame the query runs on; filter values are coerced to its column types
+    if not isinstance(spec, dict):
+        raise ValueError("Expected a JSON object describing the query")
+    group_by = _as_list(spec.get("group_by"))
+    for column in group_by:
+        if column not in QUERY_DIMENSIONS:
+            raise ValueError(f"Unknown group_by dimension: {column}")
+
+    metrics = []
+    for metric in _as_list(spec.get("metrics")) or ["count"]:
+        if isinstance(metric, dict):
+            agg, column = metric.get("agg"), metric.get("column")
+        else:
+            agg, _, column = metric.partition(":")
+        if agg not in QUERY_AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {agg}")
+        if agg == "count" and not column:
+            column = "PaymentIntent ID"
+        elif column not in QUERY_METRIC_COLUMNS and not (agg == "nunique" and column in QUERY_DIMENSIONS):
+            raise ValueError(f"Cannot compute {agg} over column: {column}")
+        metrics.append((agg, column))
+
+    filters = {}
+    spec_filters = spec.get("filters") or {}
+    if not isinstance(spec_filters, dict):
+        raise ValueError("filters must map column names to values")
+    for column, values in spec_filters.items():
+        if column not in QUERY_DIMENSIONS:
+            raise ValueError(f"Unknown filter column: {column}")
+        values = [values] if isinstance(values, (bool, int, float)) else _as_list(values)
+        kind = _column_kind(df[column]) if df is not None and column in df.columns else None
+        filters[column] = sorted((_coerce_filter_value(column, value, kind) for value in values), key=str)
+
+    grain = spec.get("grain")
+    if grain is not None and grain not in QUERY_GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+
+    return {
+        "group_by": group_by,
+        "metrics": metrics,
+        "filters": dict(sorted(filters.items())),
+        "grain": grain,
+        "start": parse_query_date(spec, "start"),
+        "end": parse_query_date(spec, "end")
+    }
+
+
+def run_query(df, query):
+    mask = pd.Series(True, index=df.index)
+    for column, values in query["filters"].items():
+        mask &= df[column].isin(values)
+
+    columns = set(query["group_by"]) | {column for _, column in query["metrics"]} | {"Created date"}
+    frame = df.loc[mask, [column for column in df.columns if column in columns]]
+
+    group_by = list(query["group_by"])
+    if query["grain"] or query["start"] or query["end"]:
+        created = pd.to_datetime(frame["Created date"], format="%d/%m/%Y", errors="coerce")
+        date_mask = pd.Series(True, index=frame.index)
+        if query["start"]:
+            date_mask &= created >= pd.Timestamp(query["start"])
+        if query["end"]:
+            date_mask &= created <= pd.Timestamp(query["end"])
+        frame, created = frame[date_mask], created[date_mask]
+        if query["grain"]:
+            frame = frame.assign(Period=created.dt.to_period(QUERY_GRAINS[query["grain"]]).astype(str))
+            group_by = ["Period"] + group_by
+
+    named = {f"{agg}:{column}" if column != "PaymentIntent ID" else "count": (column, agg)
+             for agg, column in query["metrics"]}
+    if group_by:
+        result = frame.groupby(group_by, dropna=False, sort=True).agg(**named).reset_index()
+    else:
+        result = pd.DataFrame([{name: frame[column].agg(agg) for name, (column, agg) in named.items()}])
+
+    return result.astype(object).where(result.notna(), None)
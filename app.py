@@ -1,11 +1,16 @@
+import hashlib
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots 
 
-# Load data with st.cache_data
-@st.cache_data
+# Most value labels drawn on a line chart
+MAX_POINT_LABELS = 40
+
+# Load and clean the sheet export; cached once per process through load_data below
 def load_and_process_data():
     url = "https://docs.google.com/spreadsheets/d/1FKPhjul2X1qDdfcv3EneYOT08FN7lBsUaIGTS_j238g/export?format=csv"
     # Read the CSV file
@@ -62,8 +67,40 @@ def load_and_process_data():
     # Return cleaned dataframe
     return df
 
+# The cleaned frame is shared by every session without copying (cache_resource), along
+# with parsed Created dates and a content hash. Page aggregates below are cached on
+# that hash; their _data arguments are not hashed by Streamlit, so a rerun only pays
+# for a cache lookup keyed by the version and the page's own filter values.
+@st.cache_resource
+def load_data():
+    df = load_and_process_data()
+    created = pd.to_datetime(df["Created date"], format="%d/%m/%Y", errors="coerce")
+    df["Month"] = created.dt.to_period("M").astype(str)
+    row_hashes = pd.util.hash_pandas_object(df, index=False).values
+    return df, created, hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
+def in_date_range(created, date_range):
+    if len(date_range) < 2:
+        return pd.Series(True, index=created.index)
+    return (created >= pd.Timestamp(date_range[0])) & (created <= pd.Timestamp(date_range[1]))
+
+# Disputed rows only, sorted by evidence due date for binary-search filtering
+@st.cache_data
+def load_dispute_data(_data, version):
+    disputed = _data[_data["Dispute Date (UTC)"].notna() | (_data["Disputed Amount"] > 0)].copy()
+    disputed["Evidence Due"] = pd.to_datetime(disputed["Dispute Evidence Due (UTC)"], format="%d/%m/%Y", errors="coerce")
+    return disputed.sort_values(by="Evidence Due", kind="stable", na_position="last")
+
 # Load and process data
-data = load_and_process_data()
+data, created_dates, data_version = load_data()
+
+# Caches keyed on free-text filter input are bounded and expire, as every distinct
+# search or filter would otherwise keep its own row positions or CSV alive. Filters
+# cache row positions, not frames: st.cache_data pickles what it stores and hands
+# every hit a fresh copy, which for a filtered frame costs more than the filter.
+FILTER_CACHE_ENTRIES = 32
+CSV_CACHE_ENTRIES = 4
+FILTER_CACHE_TTL = "10m"
 
 # Display a sample of the cleaned data
 if not data.empty:
@@ -74,58 +111,38 @@ else:
     st.error("No data loaded. Please check the file.")
 
 
-# Sidebar Navigation
-st.sidebar.title("Payments Dashboard")
-pages = ["Overview", "Customer Metrics", "Transactions","Refunds", "Disputes", "Adspends vs Subscriptions"]
-selected_page = st.sidebar.selectbox("Select a Page", pages)
-
-# Overview Page
-if selected_page == "Overview":
-    st.title("Overall Payment Metrics")
-
-    # Metrics
-    total_payment_value = data["Converted Amount"].sum()
-    total_success = data[data["Status"] == "Paid"]["Converted Amount"].sum()
-    total_failed = data[(data["Status"] != "Paid") & (data["Status"] != "Refunded")]["Converted Amount"].sum()
-    total_gateway_charge = data["Gateway charges in USD"].sum()
-    total_fee = data["Fee"].sum()
-    total_refunded = data[data["Status"] == "Refunded"]["Converted Amount Refunded"].sum()
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Payment Value", f"${total_payment_value:,.2f}")
-        st.metric("Total Successful Payments", f"${total_success:,.2f}")
-    with col2:
-        st.metric("Total Failed Payments", f"${total_failed:,.2f}")
-        st.metric("Total Gateway Charges", f"${total_gateway_charge:,.2f}")
-    with col3:
-        st.metric("Total Fee", f"${total_fee:,.2f}")
-        st.metric("Total Refunded",f"${total_refunded:,.2f}")
+# Overview metrics and figures, rebuilt only when the data version changes
+@st.cache_data
+def overview_page(_data, version):
+    data = _data
+    failed = (data["Status"] != "Paid") & (data["Status"] != "Refunded")
+    metrics = {
+        "Total Payment Value": data["Converted Amount"].sum(),
+        "Total Successful Payments": data[data["Status"] == "Paid"]["Converted Amount"].sum(),
+        "Total Failed Payments": data[failed]["Converted Amount"].sum(),
+        "Total Gateway Charges": data["Gateway charges in USD"].sum(),
+        "Total Fee": data["Fee"].sum(),
+        "Total Refunded": data[data["Status"] == "Refunded"]["Converted Amount Refunded"].sum()
+    }
+    figures = {}
 
     # Success vs Failed vs Refunded Pie Chart
-    col1, col2 = st.columns(2)
-    with col1:
-        status_counts = data["Status"].value_counts()
-        fig_pie = px.pie(
-            names=status_counts.index,
-            values=status_counts.values,
-            title="Success vs Failed vs Refunded (Count)",
-            labels={"index": "Status", "value": "Count"}
-        )
-        st.plotly_chart(fig_pie)
-    with col2:
-        status_amount = data.groupby("Status")["Converted Amount"].sum()
-        fig_pie_amount = px.pie(
-            names=status_amount.index,
-            values=status_amount.values,
-            title="Success vs Failed vs Refunded (Amount))",
-            labels={"index": "Status", "value": "Converted Amount"}
-        )
-        st.plotly_chart(fig_pie_amount)
+    status_counts = data["Status"].value_counts()
+    figures["status_count"] = px.pie(
+        names=status_counts.index,
+        values=status_counts.values,
+        title="Success vs Failed vs Refunded (Count)",
+        labels={"index": "Status", "value": "Count"}
+    )
+    status_amount = data.groupby("Status")["Converted Amount"].sum()
+    figures["status_amount"] = px.pie(
+        names=status_amount.index,
+        values=status_amount.values,
+        title="Success vs Failed vs Refunded (Amount))",
+        labels={"index": "Status", "value": "Converted Amount"}
+    )
 
     # Revenue Over Time Grouped by Month
-    st.write("Revenue Over Time (Grouped by Month)")
-    data["Month"] = pd.to_datetime(data["Created date"], errors='coerce').dt.to_period("M").astype(str)
-
     monthly_revenue = data.groupby("Month")["Converted Amount"].sum().reset_index()
     fig_revenue = px.line(
         monthly_revenue,
@@ -137,30 +154,24 @@ if selected_page == "Overview":
         hover_data=["Converted Amount"]
     )
 
-    # Add annotations for each data point
-    for i, row in monthly_revenue.iterrows():
-        fig_revenue.add_annotation(
-            x=row["Month"],
-            y=row["Converted Amount"],
-            text=f"{row['Converted Amount']}",
-            showarrow=False,
-            font=dict(size=10, color="black"),
-            bgcolor="white",
-            bordercolor="black",
-            borderwidth=1
-        )
+    # Label the data points with one text layer, thinned out for long series
+    step = max(1, -(-len(monthly_revenue) // MAX_POINT_LABELS))
+    fig_revenue.update_traces(
+        mode="lines+markers+text",
+        text=[f"{value}" if i % step == 0 or i == len(monthly_revenue) - 1 else "" for i, value in enumerate(monthly_revenue["Converted Amount"])],
+        textposition="top center",
+        textfont=dict(size=10, color="black")
+    )
+    figures["revenue"] = fig_revenue
 
-    st.plotly_chart(fig_revenue)
-    
-    
-    
-    # Correct Monthly Totals Calculation
-    monthly_summary = data.groupby("Month").agg(
-        Total_Payments=("Converted Amount", "sum"),
-        Total_Refunded=("Converted Amount Refunded", lambda x: x[data.loc[x.index, "Status"] == "Refunded"].sum()),
-        Total_Successful=("Converted Amount", lambda x: x[data.loc[x.index, "Status"] == "Paid"].sum()),
-        Total_Failed=("Converted Amount", lambda x: x[data.loc[x.index, "Status"].isin(["Failed", "Other_Failed_Status"])].sum())
-    ).reset_index()
+    # Correct Monthly Totals Calculation, one vectorized groupby instead of per-group lambdas
+    monthly_summary = pd.DataFrame({
+        "Month": data["Month"],
+        "Total_Payments": data["Converted Amount"],
+        "Total_Refunded": data["Converted Amount Refunded"].where(data["Status"] == "Refunded", 0),
+        "Total_Successful": data["Converted Amount"].where(data["Status"] == "Paid", 0),
+        "Total_Failed": data["Converted Amount"].where(data["Status"].isin(["Failed", "Other_Failed_Status"]), 0)
+    }).groupby("Month").sum().reset_index()
 
     # Remove "Total Payments" from the visualization
     graph_data = monthly_summary.drop(columns=["Total_Payments"])
@@ -201,10 +212,7 @@ if selected_page == "Overview":
         ),
         customdata=melted_graph_data[["Total_Refunded", "Total_Successful", "Total_Failed", "Total_Payments"]].values
     )
-
-    # Display the chart
-    st.plotly_chart(fig_monthly_totals)
-
+    figures["monthly_totals"] = fig_monthly_totals
 
     # Normalize data for 100% Stacked Bar Chart
     normalized_graph_data = melted_graph_data.copy()
@@ -255,24 +263,20 @@ if selected_page == "Overview":
         ),
         customdata=normalized_graph_data[["Refunded (%)", "Successful (%)", "Failed (%)"]].values
     )
-
-    # Show the chart
-    st.plotly_chart(fig_monthly_totals_stacked)
-
+    figures["monthly_totals_stacked"] = fig_monthly_totals_stacked
 
     # Adspends and Subscription: Month X Total Payment, Success, Failed, Refund
     for category in ["Adspends", "Subscription"]:
-        st.write(f"{category} Monthly Breakdown")
         category_data = data[data["Adspends / Subscription"] == category]
-        category_summary = category_data.groupby("Month").agg({
+        category_summary = category_data.assign(Paid=category_data["Status"] == "Paid").groupby("Month").agg({
             "Converted Amount": "sum",
-            "Status": lambda x: (x == "Paid").sum(),
+            "Paid": "sum",
             "Converted Amount Refunded": "sum"
-        }).rename(columns={"Converted Amount": "Total Payment", "Status": "Successful Payments"})
+        }).rename(columns={"Converted Amount": "Total Payment", "Paid": "Successful Payments"})
         category_summary["Failed Payments"] = category_data[(category_data["Status"] != "Paid") & (category_data["Status"] != "Refunded")].groupby("Month")["Converted Amount"].sum()
         category_summary = category_summary.reset_index()
 
-        fig_category = px.bar(
+        figures[f"{category} breakdown"] = px.bar(
             category_summary.melt(id_vars=["Month"], var_name="Type", value_name="Amount"),
             x="Month",
             y="Amount",
@@ -280,130 +284,94 @@ if selected_page == "Overview":
             title=f"{category} Monthly Payment Breakdown",
             barmode="group"
         )
-        st.plotly_chart(fig_category)
 
     # Bar Graph: Descending Order of Card Address Country
-    st.write("Payments by Card Address Country")
     country_summary = data.groupby("Card Address Country")["Converted Amount"].sum().reset_index()
     country_summary = country_summary.sort_values(by="Converted Amount", ascending=False)
-    fig_country = px.bar(
+    figures["country"] = px.bar(
         country_summary,
         x="Card Address Country",
         y="Converted Amount",
         title="Payments by Country",
         labels={"Card Address Country": "Country", "Converted Amount": "Total Payment"}
     )
-    st.plotly_chart(fig_country)
 
     # Failed Payments Reason Analysis
-    st.write("Failed Payments Reason Analysis")
-    failed_reasons = data[(data["Status"] != "Paid") & (data["Status"] != "Refunded")]["Decline Reason"].value_counts().reset_index()
+    failed_reasons = data[failed]["Decline Reason"].value_counts().reset_index()
     failed_reasons.columns = ["Decline Reason", "Count"]
-    fig_failed_reasons = px.bar(
+    figures["failed_reasons"] = px.bar(
         failed_reasons,
         x="Decline Reason",
         y="Count",
         title="Overall Failed Payments Reason Analysis",
         labels={"Decline Reason": "Reason", "Count": "Occurrences"}
     )
-    st.plotly_chart(fig_failed_reasons)
 
     for category in ["Adspends", "Subscription"]:
-        st.write(f"{category} Failed Payments Reason Analysis")
-        category_failed = data[(data["Adspends / Subscription"] == category) & (data["Status"] != "Paid") & (data["Status"] != "Refunded")]
+        category_failed = data[(data["Adspends / Subscription"] == category) & failed]
         category_reasons = category_failed["Decline Reason"].value_counts().reset_index()
         category_reasons.columns = ["Decline Reason", "Count"]
-        fig_category_reasons = px.bar(
+        figures[f"{category} failed_reasons"] = px.bar(
             category_reasons,
             x="Decline Reason",
             y="Count",
             title=f"{category} Failed Payments Reason Analysis",
             labels={"Decline Reason": "Reason", "Count": "Occurrences"}
         )
-        st.plotly_chart(fig_category_reasons)
-
-
-# Other Pages
-elif selected_page == "Customer Metrics":
-    st.title("Customer-Level Metrics")
-    email = st.text_input("Enter Customer Email:")
-    if email:
-        customer_data = data[data['Customer Email'] == email]
-        if not customer_data.empty:
-            st.write(f"Metrics for {email}:")
-            st.metric("Total Payments", customer_data['Amount'].sum())
-            st.metric("Total Refunds", customer_data['Amount Refunded'].sum())
-            st.metric("Total Transactions", customer_data.shape[0])
-            st.dataframe(customer_data)
-        else:
-            st.warning("No data found for this email.")
 
+    return metrics, figures
 
-elif selected_page == "Transactions":
-    st.title("Transaction Details")
-    st.write("Explore all transactions with filters, sorting, and search.")
-
-    # Filters
-    status_filter = st.multiselect("Select Status", data["Status"].unique())
-    captured_filter = st.selectbox("Captured?", ["All", "Yes", "No"])
-    adspends_filter = st.selectbox("Adspends / Subscription", ["All"] + data["Adspends / Subscription"].unique().tolist())
-    date_range = st.date_input("Select Date Range", [])
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES, ttl=FILTER_CACHE_TTL)
+def customer_positions(_data, version, email):
+    return np.flatnonzero(_data['Customer Email'] == email)
 
-    filtered_data = data.copy()
+def customer_rows(_data, version, email):
+    return _data.iloc[customer_positions(_data, version, email)]
 
-    # Apply Filters
+# Filtered transactions and their CSV export, cached per filter combination
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES, ttl=FILTER_CACHE_TTL)
+def transaction_positions(_data, _created, version, status_filter, captured_filter, adspends_filter, date_range, search_term):
+    mask = in_date_range(_created, date_range)
     if status_filter:
-        filtered_data = filtered_data[filtered_data["Status"].isin(status_filter)]
+        mask &= _data["Status"].isin(status_filter)
     if captured_filter == "Yes":
-        filtered_data = filtered_data[filtered_data["Captured"] == True]
+        mask &= _data["Captured"] == True
     elif captured_filter == "No":
-        filtered_data = filtered_data[filtered_data["Captured"] == False]
+        mask &= _data["Captured"] == False
     if adspends_filter != "All":
-        filtered_data = filtered_data[filtered_data["Adspends / Subscription"] == adspends_filter]
-    if date_range:
-        filtered_data = filtered_data[
-            (filtered_data["Created date"] >= pd.Timestamp(date_range[0])) &
-            (filtered_data["Created date"] <= pd.Timestamp(date_range[1]))
-        ]
-
-    # Search Functionality
-    search_term = st.text_input("Search by PaymentIntent ID or Customer ID")
+        mask &= _data["Adspends / Subscription"] == adspends_filter
+    positions = np.flatnonzero(mask)
+
+    # Search Functionality, over the rows left by the other filters
     if search_term:
-        filtered_data = filtered_data[
+        filtered_data = _data.iloc[positions]
+        found = (
             filtered_data["PaymentIntent ID"].str.contains(search_term, na=False) |
             filtered_data["Customer ID"].str.contains(search_term, na=False)
-        ]
-
-    # Display Table
-    st.dataframe(filtered_data)
+        )
+        positions = positions[found.to_numpy()]
+    return positions
 
-    # Export to CSV
-    st.download_button(
-        label="Download Filtered Data as CSV",
-        data=filtered_data.to_csv(index=False),
-        file_name="filtered_transactions.csv",
-        mime="text/csv"
-    )
+def filter_transactions(_data, _created, version, *filters):
+    return _data.iloc[transaction_positions(_data, _created, version, *filters)]
 
+# CSV exports are keyed on the data version and filter values only
+@st.cache_data(max_entries=CSV_CACHE_ENTRIES, ttl=FILTER_CACHE_TTL)
+def transactions_csv(version, filters):
+    return filter_transactions(data, created_dates, version, *filters).to_csv(index=False)
 
-elif selected_page == "Refunds":
-    st.title("Refunds Dashboard")
-    st.write("Overview and analysis of refunds.")
-
-    # Metrics
-    total_refunded_amount = data["Amount Refunded"].sum()
-    total_refunds = data[data["Amount Refunded"] > 0].shape[0]
-
-    st.metric("Total Refunded Amount", f"${total_refunded_amount:,.2f}")
-    st.metric("Total Refunds", total_refunds)
+@st.cache_data
+def refunds_page(_data, version):
+    refunded = _data[_data["Amount Refunded"] > 0]
+    metrics = {
+        "Total Refunded Amount": _data["Amount Refunded"].sum(),
+        "Total Refunds": refunded.shape[0]
+    }
 
     # Refund Trends Over Time
-    st.write("Refund Trends Over Time:")
-    refund_trends = data[data["Amount Refunded"] > 0].groupby("Created date").agg({
+    refund_trends = refunded.groupby("Created date").agg({
         "Amount Refunded": "sum"
     }).reset_index()
-    
-    # Use Plotly for the line chart
     fig_trends = px.line(
         refund_trends,
         x="Created date",
@@ -411,15 +379,11 @@ elif selected_page == "Refunds":
         title="Refund Trends Over Time",
         labels={"Created date": "Date", "Amount Refunded": "Refunded Amount"}
     )
-    st.plotly_chart(fig_trends)
 
     # Breakdown by Currency
-    st.write("Refund Breakdown by Currency:")
-    refund_by_currency = data[data["Amount Refunded"] > 0].groupby("Currency").agg({
+    refund_by_currency = refunded.groupby("Currency").agg({
         "Amount Refunded": "sum"
     }).reset_index()
-    
-    # Use Plotly for the bar chart
     fig_currency = px.bar(
         refund_by_currency,
         x="Currency",
@@ -427,72 +391,37 @@ elif selected_page == "Refunds":
         title="Refunds by Currency",
         labels={"Currency": "Currency", "Amount Refunded": "Refunded Amount"}
     )
-    st.plotly_chart(fig_currency)
+    return metrics, fig_trends, fig_currency
 
-    # Refund Filters
-    st.write("Filter Refund Data:")
-    date_range = st.date_input("Select Date Range", [])
-    refund_status = st.selectbox("Select Refund Status", ["All", "Successful", "Failed"])
-    filtered_refunds = data[data["Amount Refunded"] > 0].copy()
-
-    # Apply Filters
-    if date_range:
-        filtered_refunds = filtered_refunds[
-            (filtered_refunds["Created date"] >= pd.Timestamp(date_range[0])) &
-            (filtered_refunds["Created date"] <= pd.Timestamp(date_range[1]))
-        ]
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES, ttl=FILTER_CACHE_TTL)
+def refund_positions(_data, _created, version, date_range, refund_status):
+    mask = (_data["Amount Refunded"] > 0) & in_date_range(_created, date_range)
     if refund_status != "All":
-        filtered_refunds = filtered_refunds[filtered_refunds["Status"].str.lower() == refund_status.lower()]
+        mask &= _data["Status"].str.lower() == refund_status.lower()
+    return np.flatnonzero(mask)
 
-    # Refund Details Table
-    st.write("Refund Details:")
-    st.dataframe(filtered_refunds)
+def filter_refunds(_data, _created, version, date_range, refund_status):
+    return _data.iloc[refund_positions(_data, _created, version, date_range, refund_status)]
 
-    # Export Filtered Refunds to CSV
-    st.download_button(
-        label="Download Filtered Refund Data as CSV",
-        data=filtered_refunds.to_csv(index=False),
-        file_name="filtered_refunds.csv",
-        mime="text/csv"
-    )
+@st.cache_data(max_entries=CSV_CACHE_ENTRIES, ttl=FILTER_CACHE_TTL)
+def refunds_csv(version, date_range, refund_status):
+    return filter_refunds(data, created_dates, version, date_range, refund_status).to_csv(index=False)
 
-elif selected_page == "Disputes":
-    st.title("Disputes Dashboard")
-    st.write("Overview and analysis of disputes.")
-
-    # Metrics
-    total_disputed_amount = data["Disputed Amount"].sum()
-    total_disputes = data["Dispute Date (UTC)"].count()
-
-    st.metric("Total Disputed Amount", f"${total_disputed_amount:,.2f}")
-    st.metric("Total Disputes", total_disputes)
-
-    # Breakdown by Dispute Reason and Status
-    st.write("Dispute Breakdown:")
-    dispute_reason_counts = data["Dispute Reason"].value_counts()
-    st.bar_chart(dispute_reason_counts)
-
-    dispute_status_counts = data["Dispute Status"].value_counts()
-    st.bar_chart(dispute_status_counts)
-
-    # Dispute Trends Over Time
-    st.write("Dispute Trends Over Time:")
-    dispute_trends = data.groupby("Dispute Date (UTC)")["Disputed Amount"].sum().reset_index()
-    st.line_chart(dispute_trends, x="Dispute Date (UTC)", y="Disputed Amount")
-
-    # List of Disputes with Filters
-    dispute_due_filter = st.date_input("Filter by Evidence Due Date")
-    filtered_disputes = data.copy()
-    if dispute_due_filter:
-        filtered_disputes = filtered_disputes[
-            pd.to_datetime(filtered_disputes["Dispute Evidence Due (UTC)"], errors='coerce') <= pd.to_datetime(dispute_due_filter)
-        ]
-
-    st.dataframe(filtered_disputes)
+@st.cache_data
+def disputes_page(_data, version):
+    disputes = load_dispute_data(_data, version)
+    return {
+        "total_disputed_amount": disputes["Disputed Amount"].sum(),
+        "total_disputes": disputes["Dispute Date (UTC)"].count(),
+        "reason_counts": disputes["Dispute Reason"].value_counts(),
+        "status_counts": disputes["Dispute Status"].value_counts(),
+        "trends": disputes.groupby("Dispute Date (UTC)")["Disputed Amount"].sum().reset_index()
+    }
 
-elif selected_page == "Adspends vs Subscriptions":
-    st.title("Adspends vs Subscriptions")
-    st.write("Breakdown and analysis of revenue, refunds, and charges by type.")
+@st.cache_data
+def adspends_page(_data, _created, version):
+    data = _data
+    figures = {}
 
     # Aggregate Data by Category
     category_summary = data.groupby("Adspends / Subscription").agg({
@@ -501,31 +430,24 @@ elif selected_page == "Adspends vs Subscriptions":
         "Gateway charges in USD": "sum"
     }).reset_index()
 
-    # Display Summary Table
-    st.write("Summary by Category:")
-    st.dataframe(category_summary)
-
     # Revenue Trends by Category
-    st.write("Revenue Trends by Category:")
     revenue_trends = data.groupby(["Adspends / Subscription", "Created date"]).agg({
         "Amount": "sum"
     }).reset_index()
 
     # Create a Plotly Line Chart for Each Category
+    figures["trends"] = []
     for category in revenue_trends["Adspends / Subscription"].unique():
         category_data = revenue_trends[revenue_trends["Adspends / Subscription"] == category]
-        fig = px.line(
+        figures["trends"].append(px.line(
             category_data,
             x="Created date",
             y="Amount",
             title=f"{category} Revenue Trend Over Time",
             labels={"Created date": "Date", "Amount": "Revenue"},
-        )
-        st.plotly_chart(fig)
-
+        ))
 
     # Revenue Trends with Dual Axes
-    st.write("Revenue Trends by Category (Dual Axes):")
     revenue_trends = data.groupby(["Created date", "Adspends / Subscription"]).agg({
         "Amount": "sum"
     }).reset_index()
@@ -566,50 +488,41 @@ elif selected_page == "Adspends vs Subscriptions":
         yaxis_title="Adspends Revenue",
         yaxis2_title="Subscriptions Revenue",
     )
-
-    st.plotly_chart(fig_dual_axes)
+    figures["dual_axes"] = fig_dual_axes
 
     # Refunds by Category
-    st.write("Refunds by Category:")
-    fig_refunds = px.bar(
+    figures["refunds"] = px.bar(
         category_summary,
         x="Adspends / Subscription",
         y="Amount Refunded",
         title="Refunds by Category",
         labels={"Adspends / Subscription": "Category", "Amount Refunded": "Refunded Amount"},
     )
-    st.plotly_chart(fig_refunds)
 
     # Gateway Charges by Category
-    st.write("Gateway Charges by Category:")
-    fig_charges = px.bar(
+    figures["charges"] = px.bar(
         category_summary,
         x="Adspends / Subscription",
         y="Gateway charges in USD",
         title="Gateway Charges by Category",
         labels={"Adspends / Subscription": "Category", "Gateway charges in USD": "Gateway Charges"},
     )
-    st.plotly_chart(fig_charges)
-
-    st.write("Monthly Amount by Category (Dual Axes):")
 
     # Prepare Data
-    data["Year-Month"] = data["Created date"].dt.to_period("M").astype(str)
-    gateway_monthly = data.groupby(["Year-Month", "Adspends / Subscription"]).agg({
+    gateway_monthly = data.assign(**{"Year-Month": _created.dt.to_period("M").astype(str)}).groupby(["Year-Month", "Adspends / Subscription"]).agg({
         "Converted Amount": "sum"
     }).reset_index()
     gateway_monthly = gateway_monthly.rename(columns={"Converted Amount": "Amount in USD"})
-    st.dataframe(gateway_monthly)
 
     # Separate Data for Adspends and Subscriptions
     adspends_data = gateway_monthly[gateway_monthly["Adspends / Subscription"] == "Adspends"]
     subscriptions_data = gateway_monthly[gateway_monthly["Adspends / Subscription"] == "Subscription"]
 
     # Create Subplots with Secondary Y-axis
-    fig_dual_axes = make_subplots(specs=[[{"secondary_y": True}]])
+    fig_monthly_dual_axes = make_subplots(specs=[[{"secondary_y": True}]])
 
     # Add Adspends to the left Y-axis
-    fig_dual_axes.add_trace(
+    fig_monthly_dual_axes.add_trace(
         go.Bar(
             x=adspends_data["Year-Month"],
             y=adspends_data["Amount in USD"],
@@ -620,7 +533,7 @@ elif selected_page == "Adspends vs Subscriptions":
     )
 
     # Add Subscriptions to the right Y-axis
-    fig_dual_axes.add_trace(
+    fig_monthly_dual_axes.add_trace(
         go.Bar(
             x=subscriptions_data["Year-Month"],
             y=subscriptions_data["Amount in USD"],
@@ -631,7 +544,7 @@ elif selected_page == "Adspends vs Subscriptions":
     )
 
     # Update Axes Titles
-    fig_dual_axes.update_layout(
+    fig_monthly_dual_axes.update_layout(
         title="Monthly Amount by Category (Dual Axes)",
         xaxis_title="Month",
         yaxis_title="Adspends Amount",
@@ -639,6 +552,202 @@ elif selected_page == "Adspends vs Subscriptions":
         barmode="group",
         legend_title="Category",
     )
+    figures["monthly_dual_axes"] = fig_monthly_dual_axes
 
-    # Show Plot
-    st.plotly_chart(fig_dual_axes)
\ No newline at end of file
+    return category_summary, gateway_monthly, figures
+
+# Filter widgets live in fragments, so changing one reruns only its own section
+@st.fragment
+def customer_metrics_fragment():
+    email = st.text_input("Enter Customer Email:")
+    if email:
+        customer_data = customer_rows(data, data_version, email)
+        if not customer_data.empty:
+            st.write(f"Metrics for {email}:")
+            st.metric("Total Payments", customer_data['Amount'].sum())
+            st.metric("Total Refunds", customer_data['Amount Refunded'].sum())
+            st.metric("Total Transactions", customer_data.shape[0])
+            st.dataframe(customer_data)
+        else:
+            st.warning("No data found for this email.")
+
+@st.fragment
+def transactions_fragment():
+    # Filters
+    status_filter = st.multiselect("Select Status", data["Status"].unique())
+    captured_filter = st.selectbox("Captured?", ["All", "Yes", "No"])
+    adspends_filter = st.selectbox("Adspends / Subscription", ["All"] + data["Adspends / Subscription"].unique().tolist())
+    date_range = st.date_input("Select Date Range", [])
+    search_term = st.text_input("Search by PaymentIntent ID or Customer ID")
+
+    filters = (tuple(status_filter), captured_filter, adspends_filter, tuple(date_range), search_term)
+    filtered_data = filter_transactions(data, created_dates, data_version, *filters)
+
+    # Display Table
+    st.dataframe(filtered_data)
+
+    # Export to CSV
+    st.download_button(
+        label="Download Filtered Data as CSV",
+        data=transactions_csv(data_version, filters),
+        file_name="filtered_transactions.csv",
+        mime="text/csv"
+    )
+
+@st.fragment
+def refunds_fragment():
+    st.write("Filter Refund Data:")
+    date_range = tuple(st.date_input("Select Date Range", []))
+    refund_status = st.selectbox("Select Refund Status", ["All", "Successful", "Failed"])
+    filtered_refunds = filter_refunds(data, created_dates, data_version, date_range, refund_status)
+
+    # Refund Details Table
+    st.write("Refund Details:")
+    st.dataframe(filtered_refunds)
+
+    # Export Filtered Refunds to CSV
+    st.download_button(
+        label="Download Filtered Refund Data as CSV",
+        data=refunds_csv(data_version, date_range, refund_status),
+        file_name="filtered_refunds.csv",
+        mime="text/csv"
+    )
+
+@st.fragment
+def disputes_fragment():
+    disputes = load_dispute_data(data, data_version)
+
+    # List of Disputes with Filters
+    dispute_due_filter = st.date_input("Filter by Evidence Due Date")
+    filtered_disputes = disputes
+    if dispute_due_filter:
+        due_dates = disputes["Evidence Due"].values
+        end = np.searchsorted(due_dates, np.datetime64(pd.to_datetime(dispute_due_filter)), side="right")
+        filtered_disputes = disputes.iloc[:end]
+
+    st.dataframe(filtered_disputes)
+
+# Sidebar Navigation
+st.sidebar.title("Payments Dashboard")
+pages = ["Overview", "Customer Metrics", "Transactions","Refunds", "Disputes", "Adspends vs Subscriptions"]
+selected_page = st.sidebar.selectbox("Select a Page", pages)
+
+# Overview Page
+if selected_page == "Overview":
+    st.title("Overall Payment Metrics")
+    metrics, figures = overview_page(data, data_version)
+
+    # Metrics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Payment Value", f"${metrics['Total Payment Value']:,.2f}")
+        st.metric("Total Successful Payments", f"${metrics['Total Successful Payments']:,.2f}")
+    with col2:
+        st.metric("Total Failed Payments", f"${metrics['Total Failed Payments']:,.2f}")
+        st.metric("Total Gateway Charges", f"${metrics['Total Gateway Charges']:,.2f}")
+    with col3:
+        st.metric("Total Fee", f"${metrics['Total Fee']:,.2f}")
+        st.metric("Total Refunded",f"${metrics['Total Refunded']:,.2f}")
+
+    # Success vs Failed vs Refunded Pie Chart
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures["status_count"])
+    with col2:
+        st.plotly_chart(figures["status_amount"])
+
+    # Revenue Over Time Grouped by Month
+    st.write("Revenue Over Time (Grouped by Month)")
+    st.plotly_chart(figures["revenue"])
+    st.plotly_chart(figures["monthly_totals"])
+    st.plotly_chart(figures["monthly_totals_stacked"])
+
+    for category in ["Adspends", "Subscription"]:
+        st.write(f"{category} Monthly Breakdown")
+        st.plotly_chart(figures[f"{category} breakdown"])
+
+    st.write("Payments by Card Address Country")
+    st.plotly_chart(figures["country"])
+
+    st.write("Failed Payments Reason Analysis")
+    st.plotly_chart(figures["failed_reasons"])
+
+    for category in ["Adspends", "Subscription"]:
+        st.write(f"{category} Failed Payments Reason Analysis")
+        st.plotly_chart(figures[f"{category} failed_reasons"])
+
+
+# Other Pages
+elif selected_page == "Customer Metrics":
+    st.title("Customer-Level Metrics")
+    customer_metrics_fragment()
+
+
+elif selected_page == "Transactions":
+    st.title("Transaction Details")
+    st.write("Explore all transactions with filters, sorting, and search.")
+    transactions_fragment()
+
+
+elif selected_page == "Refunds":
+    st.title("Refunds Dashboard")
+    st.write("Overview and analysis of refunds.")
+    metrics, fig_trends, fig_currency = refunds_page(data, data_version)
+
+    # Metrics
+    st.metric("Total Refunded Amount", f"${metrics['Total Refunded Amount']:,.2f}")
+    st.metric("Total Refunds", metrics["Total Refunds"])
+
+    st.write("Refund Trends Over Time:")
+    st.plotly_chart(fig_trends)
+
+    st.write("Refund Breakdown by Currency:")
+    st.plotly_chart(fig_currency)
+
+    refunds_fragment()
+
+elif selected_page == "Disputes":
+    st.title("Disputes Dashboard")
+    st.write("Overview and analysis of disputes.")
+    summary = disputes_page(data, data_version)
+
+    # Metrics
+    st.metric("Total Disputed Amount", f"${summary['total_disputed_amount']:,.2f}")
+    st.metric("Total Disputes", summary["total_disputes"])
+
+    # Breakdown by Dispute Reason and Status
+    st.write("Dispute Breakdown:")
+    st.bar_chart(summary["reason_counts"])
+    st.bar_chart(summary["status_counts"])
+
+    # Dispute Trends Over Time
+    st.write("Dispute Trends Over Time:")
+    st.line_chart(summary["trends"], x="Dispute Date (UTC)", y="Disputed Amount")
+
+    disputes_fragment()
+
+elif selected_page == "Adspends vs Subscriptions":
+    st.title("Adspends vs Subscriptions")
+    st.write("Breakdown and analysis of revenue, refunds, and charges by type.")
+    category_summary, gateway_monthly, figures = adspends_page(data, created_dates, data_version)
+
+    # Display Summary Table
+    st.write("Summary by Category:")
+    st.dataframe(category_summary)
+
+    st.write("Revenue Trends by Category:")
+    for fig in figures["trends"]:
+        st.plotly_chart(fig)
+
+    st.write("Revenue Trends by Category (Dual Axes):")
+    st.plotly_chart(figures["dual_axes"])
+
+    st.write("Refunds by Category:")
+    st.plotly_chart(figures["refunds"])
+
+    st.write("Gateway Charges by Category:")
+    st.plotly_chart(figures["charges"])
+
+    st.write("Monthly Amount by Category (Dual Axes):")
+    st.dataframe(gateway_monthly)
+    st.plotly_chart(figures["monthly_dual_axes"])
@@ -0,0 +1,278 @@
+"""ASGI serving mode for the dashboard.
+
+Requests are accepted on an asyncio event loop and the Flask app runs on bounded
+thread pools, so the loop never blocks on pandas or Plotly:
+
+- heavy: dashboard renders, exports, refreshes, ad-hoc aggregates, leaderboards, the
+  transaction and customer pages (full-frame filters), and row windows that filter,
+  search or sort. Few workers and a bounded queue; requests beyond it get 503 with
+  Retry-After.
+- light: unfiltered row windows, typeahead, top-K reads, health checks and
+  everything else. A separate, larger pool, so cheap requests never wait
+  behind heavy ones.
+- stream: Server-Sent Events, which hold a worker for the life of the connection.
+
+Queue depth, active workers and wait times per pool are served at /debug/queues
+straight from the event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Pool sizes come from PAYMENTS_HEAVY_WORKERS, PAYMENTS_LIGHT_WORKERS,
+PAYMENTS_STREAM_WORKERS and PAYMENTS_HEAVY_QUEUE_LIMIT.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from payments import app as flask_app
+
+HEAVY_ROUTES = (
+    "/overview", "/cohorts", "/refunds", "/disputes", "/adspends-vs-subscriptions", "/leaderboard",
+    "/export", "/refresh", "/api/v1/aggregate", "/debug/memory",
+    "/transactions", "/customer-metrics", "/api/v1/customers/rows", "/api/v1/leaderboard"
+)
+# Routes that are light unless one of these parameters asks for a full-frame filter,
+# search or sort
+HEAVY_PARAMS = {
+    "/api/v1/transactions/rows": ("search_term", "sort", "status", "source", "captured", "adspends", "date_start", "date_end")
+}
+STREAM_ROUTES = ("/api/v1/overview/stream",)
+QUEUES_PATH = "/debug/queues"
+HEAVY_RETRY_SECONDS = 2
+
+
+def pool(name, workers, limit=None):
+    return {
+        "executor": ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker"),
+        "workers": workers,
+        "limit": limit,
+        "queued": 0,
+        "active": 0,
+        "completed": 0,
+        "rejected": 0,
+        "wait_seconds_total": 0.0,
+        "wait_seconds_max": 0.0
+    }
+
+
+pools = {
+    "heavy": pool("heavy", int(os.environ.get("PAYMENTS_HEAVY_WORKERS", 2)), int(os.environ.get("PAYMENTS_HEAVY_QUEUE_LIMIT", 32))),
+    "light": pool("light", int(os.environ.get("PAYMENTS_LIGHT_WORKERS", 8))),
+    "stream": pool("stream", int(os.environ.get("PAYMENTS_STREAM_WORKERS", 64)))
+}
+pools_lock = threading.Lock()
+
+
+def route_pool(path, query_string=b""):
+    if path in STREAM_ROUTES:
+        return "stream"
+    if path in HEAVY_ROUTES:
+        return "heavy"
+    if path in HEAVY_PARAMS:
+        params = parse_qs(query_string.decode("latin-1"))
+        if any(value not in ("", "All") for name in HEAVY_PARAMS[path] for value in params.get(name, [])):
+            return "heavy"
+    return "light"
+
+
+def queue_stats():
+    with pools_lock:
+        stats = {
+            name: {key: value for key, value in state.items() if key != "executor"}
+            for name, state in pools.items()
+        }
+    for values in stats.values():
+        finished = values["completed"] + values["active"]
+        values["wait_seconds_mean"] = round(values["wait_seconds_total"] / finished, 4) if finished else 0.0
+        values["wait_seconds_total"] = round(values["wait_seconds_total"], 4)
+        values["wait_seconds_max"] = round(values["wait_seconds_max"], 4)
+    return stats
+
+
+def admit(name):
+    # Admission control: a full heavy queue sheds load instead of growing latency
+    with pools_lock:
+        state = pools[name]
+        if state["limit"] is not None and state["queued"] >= state["limit"]:
+            state["rejected"] += 1
+            return False
+        return True
+
+
+async def run_in_pool(name, func, *args):
+    state = pools[name]
+    submitted = time.perf_counter()
+    with pools_lock:
+        state["queued"] += 1
+
+    def task():
+        waited = time.perf_counter() - submitted
+        with pools_lock:
+            state["queued"] -= 1
+            state["active"] += 1
+            state["wait_seconds_total"] += waited
+            state["wait_seconds_max"] = max(state["wait_seconds_max"], waited)
+        try:
+            return func(*args)
+        finally:
+            with pools_lock:
+                state["active"] -= 1
+                state["completed"] += 1
+
+    return await asyncio.get_running_loop().run_in_executor(state["executor"], task)
+
+
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False
+    }
+    for name, value in scope.get("headers", []):
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-length":
+            continue
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+            continue
+        key = "HTTP_" + name.upper().replace("-", "_")
+        # Repeated headers join with commas, except cookies, which join like one Cookie header
+        separator = "; " if key == "HTTP_COOKIE" else ","
+        environ[key] = f"{environ[key]}{separator}{value}" if key in environ else value
+    return environ
+
+
+def start_wsgi(environ):
+    # Runs the Flask app up to the response headers; the body iterable is returned unread
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return lambda data: response.setdefault("written", []).append(data)
+
+    iterable = flask_app(environ, start_response)
+    return response, iterable
+
+
+def call_wsgi(environ):
+    response, iterable = start_wsgi(environ)
+    try:
+        body = b"".join(response.get("written", []) + list(iterable))
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+    return response, body
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_response(send, status, headers, body):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode()
+    await send_response(send, status, [(b"content-type", b"application/json")] + list(headers), body)
+
+
+async def stream_response(environ, receive, send):
+    response, iterable = await run_in_pool("stream", start_wsgi, environ)
+    await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    iterator = iter(iterable)
+    try:
+        while not disconnected.is_set():
+            chunk = await run_in_pool("stream", next, iterator, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        if not disconnected.is_set():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+        if hasattr(iterable, "close"):
+            # Closing the generator runs its cleanup, e.g. unsubscribing the SSE client
+            await run_in_pool("stream", iterable.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            for state in pools.values():
+                state["executor"].shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == QUEUES_PATH:
+        await send_json(send, 200, queue_stats())
+        return
+
+    body = await read_body(receive)
+    if body is None:
+        return
+    environ = wsgi_environ(scope, body)
+
+    name = route_pool(scope["path"], scope.get("query_string", b""))
+    if not admit(name):
+        await send_json(
+            send, 503, {"error": "Server busy, retry shortly", "queue": name},
+            headers=[(b"retry-after", str(HEAVY_RETRY_SECONDS).encode())]
+        )
+        return
+    if name == "stream":
+        await stream_response(environ, receive, send)
+        return
+
+    response, response_body = await run_in_pool(name, call_wsgi, environ)
+    await send_response(send, response["status"], response["headers"], response_body)
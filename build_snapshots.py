@@ -0,0 +1,172 @@
+"""Render every dashboard page to static files in one batch.
+
+Loads the payments data once (by importing payments), which builds the shared
+incremental aggregates and indexes once. Every page and each Source filter variant
+is then written twice in parallel: index.html, the page rendered through the Flask
+test client, and index.json, the same page data helpers' output (payments.*_data) as
+JSON. The scripts, styles and chart template the pages load are copied alongside and
+linked relatively, so the output can be served from disk or a CDN.
+
+    python build_snapshots.py --out snapshots --workers 4 --precompress
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode
+
+import numpy as np
+import pandas as pd
+
+from charts import template_script
+
+PAGES = ["/overview", "/cohorts", "/refunds", "/disputes", "/adspends-vs-subscriptions"]
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Root-relative asset links in the templates, rewritten relative to each page
+ASSET_LINKS = ['"/static/', '"/chart-template.js"']
+
+
+def snapshot_targets(payments):
+    targets = [(page, {}) for page in PAGES]
+    sources = sorted(payments.data["Source"].dropna().unique().tolist())
+    targets += [("/overview", {"source": source}) for source in sources]
+    return targets
+
+
+def output_path(out_dir, page, params, name="index.html"):
+    parts = [out_dir, page.strip("/")]
+    for key, value in sorted(params.items()):
+        parts += [key, quote(str(value), safe="")]
+    return os.path.join(*parts, name)
+
+
+def jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        if not isinstance(value.index, pd.RangeIndex):
+            value = value.reset_index()
+        return jsonable(value.astype(object).where(value.notna(), None).to_dict(orient="records"))
+    if isinstance(value, dict):
+        return {str(key): jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def snapshot_payload(payments, page, params):
+    # The data the page's view renders, from the same helper
+    if page == "/overview":
+        data = payments.overview_data(params.get("source", "All"))
+        del data["ledger"]
+    elif page == "/cohorts":
+        data = payments.cohorts_data()
+    elif page == "/refunds":
+        data = payments.refunds_data()
+    elif page == "/disputes":
+        data = payments.disputes_data()
+    else:
+        data = payments.adspends_data()
+    return jsonable(dict(data, data_version=payments.data_version))
+
+
+def relative_assets(body, path, out_dir):
+    prefix = os.path.relpath(out_dir, os.path.dirname(path)).replace(os.sep, "/") + "/"
+    html = body.decode("utf-8")
+    for link in ASSET_LINKS:
+        html = html.replace(link, '"' + prefix + link[2:])
+    return html.encode("utf-8")
+
+
+def write_file(path, body, precompress):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+    if precompress:
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(body, compresslevel=9))
+
+
+def write_assets(out_dir, precompress):
+    for name in os.listdir(STATIC_DIR):
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            write_file(os.path.join(out_dir, "static", name), f.read(), precompress)
+    write_file(os.path.join(out_dir, "chart-template.js"), template_script().encode(), precompress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render all dashboard pages to static HTML and JSON.")
+    parser.add_argument("--out", default="snapshots", help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="parallel render threads")
+    parser.add_argument("--precompress", action="store_true", help="also write .gz files next to each page and payload")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    import payments
+    payments.startup_thread.join()
+    if not payments.data_ready.is_set():
+        parser.exit(1, f"Failed to load payments data: {payments.startup_state['error']}\n")
+    load_seconds = time.perf_counter() - started
+
+    local = threading.local()
+
+    def render(target):
+        page, params = target
+        if not hasattr(local, "client"):
+            local.client = payments.app.test_client()
+        url = page + ("?" + urlencode(params) if params else "")
+        t0 = time.perf_counter()
+        response = local.client.get(url, headers={"Accept-Encoding": "identity"})
+        path = output_path(args.out, page, params)
+        body = relative_assets(response.get_data(), path, args.out)
+        payload = json.dumps(snapshot_payload(payments, page, params)).encode()
+        render_seconds = time.perf_counter() - t0
+
+        json_path = output_path(args.out, page, params, "index.json")
+        write_file(path, body, args.precompress)
+        write_file(json_path, payload, args.precompress)
+
+        return {
+            "url": url,
+            "path": os.path.relpath(path, args.out),
+            "json_path": os.path.relpath(json_path, args.out),
+            "status": response.status_code,
+            "bytes": len(body),
+            "seconds": round(render_seconds, 4)
+        }
+
+    write_assets(args.out, args.precompress)
+    targets = snapshot_targets(payments)
+    render_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(render, targets))
+    render_seconds = time.perf_counter() - render_started
+
+    manifest = {
+        "data_version": payments.data_version,
+        "rows": len(payments.data),
+        "load_seconds": round(load_seconds, 4),
+        "render_seconds": round(render_seconds, 4),
+        "pages": results
+    }
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    for result in results:
+        print(f"{result['status']}  {result['seconds']:>8.3f}s  {result['bytes']:>10,d}  {result['url']}")
+    print(f"Loaded data in {load_seconds:.2f}s, rendered {len(results)} pages in {render_seconds:.2f}s "
+          f"with {args.workers} workers -> {args.out}")
+
+    failed = [result for result in results if result["status"] != 200]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
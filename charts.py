@@ -0,0 +1,129 @@
+import base64
+import json
+import uuid
+
+import numpy as np
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+# Compact chart payloads: numeric trace arrays are sent as base64 typed arrays and
+# repetitive string arrays (category axes, legend groups) as a dictionary plus codes.
+# static/scripts.js decodes both before calling Plotly.newPlot, so any plotly.js
+# version can render them.
+
+# Money values are rounded to cents. Below 2**17 float32 values are at most 2**-7 apart,
+# so the nearest float32 is within half a cent and rounding restores the exact cents
+FLOAT32_LIMIT = 2 ** 17
+MIN_ENCODED_LENGTH = 8
+INTEGER_TYPES = [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32]
+
+# The default layout template is served once as a script (see template_script) and
+# referenced by name from each chart instead of being repeated in every payload
+_default_template = None
+
+
+def _typed_array(values):
+    values = np.ascontiguousarray(values)
+    encoded = {
+        "dtype": values.dtype.str[1:],
+        "bdata": base64.b64encode(values.astype(values.dtype.newbyteorder("<")).tobytes()).decode("ascii")
+    }
+    if values.ndim > 1:
+        encoded["shape"] = ",".join(str(n) for n in values.shape)
+    return encoded
+
+
+def _encode_numeric(values):
+    if values.dtype.kind == "b":
+        values = values.astype(np.uint8)
+    if values.dtype.kind in "iu":
+        if values.size:
+            for dtype in INTEGER_TYPES:
+                info = np.iinfo(dtype)
+                if info.min <= values.min() and values.max() <= info.max:
+                    return _typed_array(values.astype(dtype))
+        return _typed_array(values.astype(np.float64))
+
+    values = np.round(values.astype(np.float64), 2)
+    finite = values[np.isfinite(values)]
+    if finite.size == 0 or np.abs(finite).max() < FLOAT32_LIMIT:
+        encoded = _typed_array(values.astype(np.float32))
+        encoded["round"] = 2
+        return encoded
+    return _typed_array(values)
+
+
+def _encode_strings(values):
+    dictionary = {}
+    codes = np.fromiter((dictionary.setdefault(value, len(dictionary)) for value in values), dtype=np.int64, count=len(values))
+    if len(dictionary) > len(values) // 2:
+        return list(values)
+    return {"dict": list(dictionary), "codes": _encode_numeric(codes)}
+
+
+def _decode_typed_array(spec):
+    # plotly.py may already hand back full-precision typed arrays; re-encode them compactly
+    array = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.dtype(spec["dtype"]).newbyteorder("<"))
+    if "shape" in spec:
+        array = array.reshape([int(n) for n in str(spec["shape"]).split(",")])
+    return array
+
+
+def _encode_array(values):
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        return _encode_numeric(array)
+    if array.dtype.kind == "M":
+        return _encode_strings([str(value) for value in np.datetime_as_string(array, unit="D")])
+    if array.ndim == 1 and all(value is None or isinstance(value, str) for value in array.tolist()):
+        return _encode_strings(array.tolist())
+    if array.ndim == 1:
+        try:
+            return _encode_numeric(array.astype(np.float64))
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def _encode_trace(value):
+    if isinstance(value, dict) and isinstance(value.get("bdata"), str) and "dtype" in value:
+        return _encode_array(_decode_typed_array(value))
+    if isinstance(value, dict):
+        return {key: _encode_trace(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)) and len(value) >= MIN_ENCODED_LENGTH:
+        return _encode_array(value)
+    return value
+
+
+def default_template():
+    global _default_template
+    if _default_template is None:
+        _default_template = (pio.templates.default, pio.templates[pio.templates.default].to_plotly_json())
+    return _default_template
+
+
+def template_script():
+    name, template = default_template()
+    return "window.CHART_TEMPLATES = " + json.dumps({name: template}, cls=PlotlyJSONEncoder, separators=(",", ":")) + ";"
+
+
+def chart_payload(fig):
+    figure = fig.to_plotly_json()
+    layout = dict(figure["layout"])
+    name, template = default_template()
+    if layout.get("template") == template:
+        layout["template"] = name
+    return {
+        "data": [_encode_trace(trace) for trace in figure["data"]],
+        "layout": layout
+    }
+
+
+def chart_json(fig):
+    return json.dumps(chart_payload(fig), cls=PlotlyJSONEncoder, separators=(",", ":"))
+
+
+def chart_html(fig, div_id=None):
+    div_id = div_id or f"chart-{uuid.uuid4().hex[:12]}"
+    payload = chart_json(fig).replace("</", "<\\/")
+    return f'<div id="{div_id}" class="plotly-chart"></div>\n<script>renderChart("{div_id}", {payload});</script>'
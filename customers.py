@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+# Typeahead index over customers: one entry per lowercased email and per Customer ID,
+# sorted by key so a prefix is a contiguous range found by binary search. Each entry
+# carries the customer's payment volume for ranking matches.
+
+PREFIX_END = chr(0x10FFFF)
+
+
+def _index_from_entries(entries):
+    entries = entries.sort_values(by=["key", "volume"], ascending=[True, False], kind="stable")
+    entries = entries.drop_duplicates(subset=["key", "email"])
+    return {
+        "keys": entries["key"].to_numpy(dtype=object),
+        "emails": entries["email"].to_numpy(dtype=object),
+        # None, never NaN, for email entries: concat may turn None into NaN
+        "customer_ids": entries["customer_id"].astype(object).where(entries["customer_id"].notna(), None).to_numpy(dtype=object),
+        "volume": entries["volume"].to_numpy(dtype=np.float64)
+    }
+
+
+def _customer_entries(rows, volumes):
+    rows = rows.loc[rows["Customer Email"].notna(), ["Customer Email", "Customer ID"]].drop_duplicates()
+    emails = rows["Customer Email"].drop_duplicates()
+    ids = rows.dropna(subset=["Customer ID"]).drop_duplicates(subset="Customer ID", keep="last")
+    entries = pd.concat([
+        pd.DataFrame({"key": emails.str.lower(), "email": emails, "customer_id": None}),
+        pd.DataFrame({"key": ids["Customer ID"].str.lower(), "email": ids["Customer Email"], "customer_id": ids["Customer ID"]})
+    ], ignore_index=True)
+    entries["volume"] = entries["email"].map(volumes).fillna(0.0)
+    return entries
+
+
+def _volumes(customers, emails=None):
+    # Total Converted Amount per email, from the incremental customer aggregate
+    if emails is None:
+        return pd.Series({key[0]: cell[1] for key, cell in customers.items()}, dtype=np.float64)
+    return pd.Series({email: customers[(email,)][1] for email in emails if (email,) in customers}, dtype=np.float64)
+
+
+def build_customer_index(df, customers):
+    return _index_from_entries(_customer_entries(df, _volumes(customers)))
+
+
+def update_customer_index(index, df, changed_rows, customers):
+    # Drop every entry of the affected emails and Customer IDs and rebuild them from the
+    # current rows (df, after the batch), so a changed email leaves no stale ID entry and
+    # customers with no payments left disappear. Only the rebuilt entries are sorted; they
+    # are merged into the kept, already sorted arrays. Returns a new index so readers
+    # never see a partial one.
+    ids = set(changed_rows["Customer ID"].dropna())
+    emails = set(changed_rows["Customer Email"].dropna())
+    emails |= set(df.loc[df["Customer ID"].isin(ids), "Customer Email"].dropna())
+    ids |= set(df.loc[df["Customer Email"].isin(emails), "Customer ID"].dropna())
+    current = df[df["Customer Email"].isin(emails) | df["Customer ID"].isin(ids)]
+    fresh = _index_from_entries(_customer_entries(current, _volumes(customers, emails)))
+
+    touched = pd.Series(index["emails"]).isin(emails).to_numpy() | pd.Series(index["customer_ids"]).isin(ids).to_numpy()
+    kept = {name: values[~touched] for name, values in index.items()}
+    return {name: np.insert(kept[name], _merge_positions(kept, fresh), fresh[name]) for name in kept}
+
+
+def _merge_positions(index, entries):
+    # Where each sorted new entry goes in the index: after the smaller keys and, among
+    # equal keys, after the entries with at least its volume (the index order)
+    lo = np.searchsorted(index["keys"], entries["keys"], side="left")
+    hi = np.searchsorted(index["keys"], entries["keys"], side="right")
+    for i in np.flatnonzero(hi > lo):
+        lo[i] += np.count_nonzero(index["volume"][lo[i]:hi[i]] >= entries["volume"][i])
+    return lo
+
+
+def resolve_customer(index, query):
+    # The email a Customer ID belongs to; anything else is taken to be an email already
+    key = query.strip().lower()
+    keys = index["keys"]
+    i = np.searchsorted(keys, key, side="left")
+    while i < len(keys) and keys[i] == key:
+        if index["customer_ids"][i] is not None:
+            return index["emails"][i]
+        i += 1
+    return query.strip()
+
+
+def suggest_customers(index, prefix, limit=10):
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    lo = np.searchsorted(index["keys"], prefix, side="left")
+    hi = np.searchsorted(index["keys"], prefix + PREFIX_END, side="left")
+    if hi <= lo:
+        return []
+
+    volume = index["volume"][lo:hi]
+    if hi - lo > limit:
+        top = np.argpartition(-volume, limit - 1)[:limit]
+    else:
+        top = np.arange(hi - lo)
+    top = top[np.argsort(-volume[top], kind="stable")]
+
+    suggestions, seen = [], set()
+    for i in top + lo:
+        email = index["emails"][i]
+        if email in seen:
+            continue
+        seen.add(email)
+        customer_id = index["customer_ids"][i]
+        suggestions.append({
+            "email": email,
+            "customer_id": customer_id,
+            "label": f"{customer_id} ({email})" if customer_id else email,
+            "volume": round(float(index["volume"][i]), 2)
+        })
+    return suggestions
+
+
+# Lifetime-value table: per-customer totals at (email, source, category) grain built in
+# one groupby, with rollups for every combination of the two split dimensions so a
+# leaderboard query is a filter plus a partial sort over customers, not payments.
+
+LTV_SPLITS = ["Source", "Adspends / Subscription"]
+LTV_SUMS = [
+    "successful_amount", "total_amount", "refunded_amount", "disputed_amount", "fees",
+    "transactions", "successful_transactions"
+]
+LTV_METRICS = LTV_SUMS + ["first_payment", "last_payment"]
+
+
+def _ltv_base(df):
+    rows = df[df["Customer Email"].notna()]
+    paid = rows["Status"] == "Paid"
+    frame = pd.DataFrame({
+        "Customer Email": rows["Customer Email"],
+        "Source": rows["Source"],
+        "Adspends / Subscription": rows["Adspends / Subscription"],
+        "successful_amount": rows["Converted Amount"].where(paid, 0),
+        "total_amount": rows["Converted Amount"],
+        "refunded_amount": rows["Converted Amount Refunded"],
+        "disputed_amount": rows["Disputed Amount"],
+        "fees": rows["Fee"],
+        "transactions": 1,
+        "successful_transactions": paid.astype(int),
+        "created": pd.to_datetime(rows["Created date"], format="%d/%m/%Y", errors="coerce")
+    })
+    aggregations = {column: "sum" for column in LTV_SUMS}
+    aggregations["created"] = ["min", "max"]
+    base = frame.groupby(["Customer Email"] + LTV_SPLITS, dropna=False, sort=False).agg(aggregations)
+    base.columns = LTV_SUMS + ["first_payment", "last_payment"]
+    return base.reset_index()
+
+
+def _ltv_rollups(base):
+    tables = {}
+    for splits in ([], ["Source"], ["Adspends / Subscription"], LTV_SPLITS):
+        if splits == LTV_SPLITS:
+            tables[tuple(splits)] = base
+            continue
+        aggregations = {column: "sum" for column in LTV_SUMS}
+        aggregations.update(first_payment="min", last_payment="max")
+        tables[tuple(splits)] = base.groupby(["Customer Email"] + splits, dropna=False, sort=False).agg(aggregations).reset_index()
+    return tables
+
+
+def build_ltv_tables(df):
+    return _ltv_rollups(_ltv_base(df))
+
+
+def update_ltv_tables(tables, df, changed_rows):
+    # Recompute only the affected customers from their payments and splice them in
+    affected = changed_rows["Customer Email"].dropna().unique()
+    base = tables[tuple(LTV_SPLITS)]
+    base = base[~base["Customer Email"].isin(affected)]
+    fresh = _ltv_base(df[df["Customer Email"].isin(affected)])
+    base = pd.concat([base, fresh], ignore_index=True)
+
+    updated = {tuple(LTV_SPLITS): base}
+    for splits, table in _ltv_rollups(fresh).items():
+        if splits == tuple(LTV_SPLITS):
+            continue
+        kept = tables[splits][~tables[splits]["Customer Email"].isin(affected)]
+        updated[splits] = pd.concat([kept, table], ignore_index=True)
+    return updated
+
+
+def top_customers(tables, metric, n=10, source=None, category=None):
+    if metric not in LTV_METRICS:
+        raise ValueError(f"Unknown leaderboard metric: {metric}")
+    splits = tuple(split for split, value in zip(LTV_SPLITS, (source, category)) if value is not None)
+    table = tables[splits]
+    if source is not None:
+        table = table[table["Source"] == source]
+    if category is not None:
+        table = table[table["Adspends / Subscription"] == category]
+    return table.nlargest(n, metric)
@@ -0,0 +1,310 @@
+"""Load-test the dashboard with a weighted mix of realistic requests.
+
+Writes a synthetic payments CSV in the sheet export format, starts a local instance
+on it (PAYMENTS_DATA_URL), waits for /readyz and then replays a weighted mix of
+overview, transactions grid windows, transaction search, customer lookup and typeahead
+requests from concurrent client threads. Reports throughput, per-route latency
+percentiles and the server's peak memory, and writes them to a JSON file so runs
+can be compared.
+
+    python loadtest.py --rows 200000 --concurrency 16 --duration 60 --out loadtest.json
+    python loadtest.py --mix overview=5,transactions=2,search=1,customer=2,suggest=3
+    python loadtest.py --asgi --concurrency 32
+
+Against an instance that is already running on the same synthetic data:
+
+    python loadtest.py --write-data synthetic.csv --rows 200000
+    PAYMENTS_DATA_URL=synthetic.csv python payments.py
+    python loadtest.py --rows 200000 --url http://127.0.0.1:5000 --pid <server pid>
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+SOURCES = ["web", "app", "partner"]
+DEFAULT_MIX = "overview=4,transactions=2,search=1,customer=2,suggest=3"
+
+
+def synthetic_payments(rows, seed=0):
+    # Raw rows in the sheet export format, with enough customers, months and statuses
+    # to exercise every aggregate the dashboard builds
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730 * 24 * 60, rows), unit="min")
+    status = rng.choice(
+        ["Paid", "Failed", "requires_payment_method", "Refunded", "Partial Refund", "canceled"],
+        rows, p=[0.6, 0.15, 0.05, 0.1, 0.05, 0.05]
+    )
+    amount = rng.gamma(2, 80, rows).round(2)
+    refunded = np.where(status == "Refunded", amount, np.where(status == "Partial Refund", (amount / 2).round(2), 0.0))
+    disputed = rng.random(rows) < 0.02
+    customers = rng.integers(0, max(1, rows // 10), rows)
+    failed = np.isin(status, ["Failed", "requires_payment_method", "canceled"])
+    return pd.DataFrame({
+        "PaymentIntent ID": [f"pi_{i:010d}" for i in range(rows)],
+        "Created date (UTC)": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "Amount": amount,
+        "Amount Refunded": refunded,
+        "Currency": rng.choice(["usd", "eur", "gbp"], rows, p=[0.7, 0.2, 0.1]),
+        "Converted Amount": amount,
+        "Converted Amount Refunded": refunded,
+        "Fee": (amount * 0.03).round(2),
+        "Taxes On Fee": 0.0,
+        "Overages in USD": 0.0,
+        "Status": status,
+        "Captured": status == "Paid",
+        "Description": rng.choice(["Subscription creation", "Subscription update", "Adspend top-up"], rows),
+        "Customer ID": [f"cus_{c:08d}" for c in customers],
+        "Customer Email": [f"customer{c}@example{c % 13}.com" for c in customers],
+        "Card Address Country": rng.choice(["US", "GB", "DE", "FR", "IN", "BR", "CA", "AU", "NL", "ES"], rows),
+        "Decline Reason": np.where(failed, rng.choice(["insufficient_funds", "do_not_honor", "expired_card", "fraudulent"], rows), None),
+        "Source": rng.choice(SOURCES, rows),
+        "Disputed Amount": np.where(disputed, amount, np.nan),
+        "Dispute Date (UTC)": np.where(disputed, (created + pd.Timedelta(days=5)).strftime("%Y-%m-%d"), None),
+        "Dispute Evidence Due (UTC)": np.where(disputed, (created + pd.Timedelta(days=20)).strftime("%Y-%m-%d"), None),
+        "Dispute Reason": np.where(disputed, rng.choice(["fraudulent", "duplicate", "product_not_received"], rows), None),
+        "Dispute Status": np.where(disputed, rng.choice(["lost", "won", "needs_response"], rows), None)
+    })
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ROUTES:
+            raise ValueError(f"Unknown route in mix: {name.strip()} (choose from {', '.join(ROUTES)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# Each route builder returns (method, path, form data) for one request
+ROUTES = {
+    "overview": lambda rng, sample: ("GET", "/overview?" + urllib.parse.urlencode({"source": rng.choice(["All"] + SOURCES)}), None),
+    "transactions": lambda rng, sample: ("GET", f"/api/v1/transactions/rows?offset={rng.randint(0, 49) * 100}&limit=100", None),
+    "search": lambda rng, sample: ("POST", "/transactions", {"search_term": rng.choice(sample["ids"])[:-rng.randint(1, 4)]}),
+    "customer": lambda rng, sample: ("GET", "/customer-metrics?" + urllib.parse.urlencode({"email": rng.choice(sample["emails"])}), None),
+    "suggest": lambda rng, sample: ("GET", "/api/v1/customers/suggest?" + urllib.parse.urlencode({"q": rng.choice(sample["emails"])[:rng.randint(1, 10)]}), None)
+}
+
+
+def request_sample(df, seed):
+    # Emails and payment IDs the generated requests look up
+    rng = np.random.default_rng(seed)
+    return {
+        "emails": rng.choice(df["Customer Email"].unique(), min(1000, df["Customer Email"].nunique()), replace=False).tolist(),
+        "ids": rng.choice(df["PaymentIntent ID"].values, min(1000, len(df)), replace=False).tolist()
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(data_path, port, serve_asgi=False):
+    env = dict(os.environ, PAYMENTS_DATA_URL=data_path)
+    env.pop("PAYMENTS_PARTITION_DIR", None)
+    if serve_asgi:
+        code = f"import uvicorn; uvicorn.run('asgi:app', host='127.0.0.1', port={port}, log_level='warning')"
+    else:
+        code = f"import payments; payments.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    return subprocess.Popen(
+        [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until_ready(base_url, timeout, server=None):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode} before becoming ready")
+        try:
+            with urllib.request.urlopen(base_url + "/readyz") as response:
+                return json.load(response)
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"{base_url} was not ready after {timeout}s")
+
+
+def memory_kb(pid, field):
+    # Linux only: VmRSS is current resident memory, VmHWM its peak
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def send(base_url, method, path, form):
+    data = urllib.parse.urlencode(form).encode() if form is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers={"Accept-Encoding": "gzip"})
+    try:
+        with urllib.request.urlopen(req) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def run_load(base_url, mix, sample, concurrency, duration, max_requests, seed):
+    names, weights = list(mix), list(mix.values())
+    results = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            with lock:
+                if max_requests and issued[0] >= max_requests:
+                    return
+                issued[0] += 1
+            name = rng.choices(names, weights)[0]
+            method, path, form = ROUTES[name](rng, sample)
+            started = time.perf_counter()
+            status = send(base_url, method, path, form)
+            elapsed = time.perf_counter() - started
+            with lock:
+                results[name].append(elapsed)
+                if status is None or status >= 400:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors, time.perf_counter() - started
+
+
+def route_report(latencies, errors, elapsed):
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a weighted request mix against the dashboard.")
+    parser.add_argument("--rows", type=int, default=100000, help="synthetic payment rows")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the data and the request mix")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent client threads")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before measuring")
+    parser.add_argument("--asgi", action="store_true", help="start the instance in ASGI mode (asgi.py under uvicorn)")
+    parser.add_argument("--url", help="target an already running instance instead of starting one")
+    parser.add_argument("--pid", type=int, help="server process to sample memory from when using --url")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="seconds to wait for /readyz")
+    parser.add_argument("--write-data", help="write the synthetic CSV to this path and exit")
+    parser.add_argument("--out", default="loadtest.json", help="JSON results file")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    df = synthetic_payments(args.rows, args.seed)
+    if args.write_data:
+        df.to_csv(args.write_data, index=False)
+        print(f"Wrote {len(df)} synthetic payments to {args.write_data}")
+        return
+    sample = request_sample(df, args.seed)
+
+    server, data_dir = None, None
+    if args.url:
+        base_url, pid = args.url.rstrip("/"), args.pid
+    else:
+        data_dir = tempfile.TemporaryDirectory()
+        data_path = os.path.join(data_dir.name, "payments.csv")
+        df.to_csv(data_path, index=False)
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(data_path, port, args.asgi)
+        pid = server.pid
+    del df
+
+    try:
+        started = time.perf_counter()
+        ready = wait_until_ready(base_url, args.ready_timeout, server)
+        startup_seconds = time.perf_counter() - started
+        print(f"{base_url} ready in {startup_seconds:.2f}s ({ready.get('rows')} rows)")
+
+        if args.warmup:
+            run_load(base_url, mix, sample, args.concurrency, args.duration, args.warmup, args.seed + 10000)
+        results, errors, elapsed = run_load(
+            base_url, mix, sample, args.concurrency, args.duration, args.requests, args.seed
+        )
+        rss_kb, peak_kb = (memory_kb(pid, "VmRSS"), memory_kb(pid, "VmHWM")) if pid else (None, None)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if data_dir is not None:
+            data_dir.cleanup()
+
+    total = sum(len(latencies) for latencies in results.values())
+    report = {
+        "config": {
+            "rows": args.rows, "seed": args.seed, "mix": mix, "concurrency": args.concurrency,
+            "duration": args.duration, "requests": args.requests, "warmup": args.warmup, "url": args.url,
+            "asgi": args.asgi
+        },
+        "startup_seconds": round(startup_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "overall": route_report([t for latencies in results.values() for t in latencies], sum(errors.values()), elapsed),
+        "routes": {name: route_report(results[name], errors[name], elapsed) for name in results},
+        "server_memory_mb": {
+            "rss": round(rss_kb / 1024, 1) if rss_kb else None,
+            "peak": round(peak_kb / 1024, 1) if peak_kb else None
+        }
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':<14}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in list(report["routes"].items()) + [("overall", report["overall"])]:
+        print(f"{name:<14}{stats['requests']:>10}{stats['errors']:>8}{stats.get('throughput_rps', 0):>10}"
+              f"{stats.get('p50_ms', '-'):>10}{stats.get('p95_ms', '-'):>10}{stats.get('p99_ms', '-'):>10}")
+    print(f"Peak server memory: {report['server_memory_mb']['peak']} MB. Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Month partitions over the processed payments frame.
+#
+# In memory each partition holds the frame labels of its rows sorted by Created date,
+# plus min/max date statistics, so a date-scoped query skips partitions outside the
+# range and binary-searches the ones on its edges. On disk each month is a parquet file
+# described by manifest.json, which carries the same statistics for pruning reads.
+
+MANIFEST_FILE = "manifest.json"
+
+
+def _created_dates(df):
+    return pd.to_datetime(df["Created date"], format="%d/%m/%Y", errors="coerce").values
+
+
+def _make_partition(labels, created):
+    order = np.argsort(created, kind="stable")
+    labels, created = labels[order], created[order]
+    valid = created[~np.isnat(created)]
+    return {
+        "labels": labels,
+        "created": created,
+        "rows": len(labels),
+        "min": valid[0] if len(valid) else np.datetime64("NaT"),
+        "max": valid[-1] if len(valid) else np.datetime64("NaT")
+    }
+
+
+def _month_keys(months):
+    # Rows without a parseable Created date share the "NaT" partition
+    return months.fillna("NaT").astype(str)
+
+
+def _add_rows(partitions, df):
+    created = _created_dates(df)
+    for month, positions in df.groupby(_month_keys(df["Month"]), sort=False).indices.items():
+        labels, dates = df.index.values[positions], created[positions]
+        partition = partitions.get(month)
+        if partition is not None:
+            labels = np.concatenate([partition["labels"], labels])
+            dates = np.concatenate([partition["created"], dates])
+        partitions[month] = _make_partition(labels, dates)
+
+
+def build_partitions(df):
+    partitions = {}
+    _add_rows(partitions, df)
+    return partitions
+
+
+def update_partitions(partitions, old_rows, new_rows):
+    # Only the months that lose or gain rows are rebuilt; returns those months
+    old_months = set(_month_keys(old_rows["Month"]))
+    affected = old_months | set(_month_keys(new_rows["Month"]))
+    for month in old_months:
+        partition = partitions.get(month)
+        if partition is None:
+            continue
+        keep = ~np.isin(partition["labels"], old_rows.index.values)
+        if keep.all():
+            continue
+        if keep.any():
+            partitions[month] = _make_partition(partition["labels"][keep], partition["created"][keep])
+        else:
+            del partitions[month]
+    _add_rows(partitions, new_rows)
+    return affected
+
+
+def _bound(value):
+    return np.datetime64(pd.Timestamp(value)) if value is not None else None
+
+
+def prune_partitions(partitions, start=None, end=None):
+    start, end = _bound(start), _bound(end)
+    selected = []
+    for month, partition in partitions.items():
+        if start is None and end is None:
+            selected.append(month)
+        elif np.isnat(partition["min"]):
+            continue
+        elif (start is None or partition["max"] >= start) and (end is None or partition["min"] <= end):
+            selected.append(month)
+    return sorted(selected)
+
+
+def select_labels(partitions, start=None, end=None):
+    # start and end are validated dates (see aggregates.parse_query_date), parsed once here
+    start, end = _bound(start), _bound(end)
+    chunks = []
+    for month in prune_partitions(partitions, start, end):
+        partition = partitions[month]
+        lo, hi = 0, partition["rows"]
+        if start is not None and partition["min"] < start:
+            lo = np.searchsorted(partition["created"], start, side="left")
+        if end is not None and partition["max"] > end:
+            hi = np.searchsorted(partition["created"], end, side="right")
+        chunks.append(partition["labels"][lo:hi])
+    if not chunks:
+        return np.array([], dtype=np.int64)
+    # Frame order, so scoped results list rows the same way as unscoped ones
+    return np.sort(np.concatenate(chunks))
+
+
+def _manifest_path(path):
+    return os.path.join(path, MANIFEST_FILE)
+
+
+def _partition_file(month):
+    return f"month={month}.parquet"
+
+
+def read_manifest(path):
+    if not os.path.exists(_manifest_path(path)):
+        return None
+    with open(_manifest_path(path)) as f:
+        return json.load(f)
+
+
+def write_partitions(df, partitions, path, months=None):
+    os.makedirs(path, exist_ok=True)
+    manifest = read_manifest(path) or {}
+    months = set(partitions) if months is None else set(months)
+
+    for month in months:
+        file_name = _partition_file(month)
+        if month not in partitions:
+            manifest.pop(month, None)
+            if os.path.exists(os.path.join(path, file_name)):
+                os.remove(os.path.join(path, file_name))
+            continue
+        partition = partitions[month]
+        df.loc[partition["labels"]].to_parquet(os.path.join(path, file_name), index=False)
+        manifest[month] = {
+            "file": file_name,
+            "rows": int(partition["rows"]),
+            "min": None if np.isnat(partition["min"]) else str(partition["min"]),
+            "max": None if np.isnat(partition["max"]) else str(partition["max"])
+        }
+
+    with open(_manifest_path(path), "w") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+
+
+def read_partitions(path, start=None, end=None, columns=None):
+    # Reads only the partition files whose min/max statistics overlap [start, end]
+    manifest = read_manifest(path) or {}
+    files = []
+    for month, stats in sorted(manifest.items()):
+        if start is not None or end is not None:
+            if stats["min"] is None:
+                continue
+            if start is not None and pd.Timestamp(stats["max"]) < pd.Timestamp(start):
+                continue
+            if end is not None and pd.Timestamp(stats["min"]) > pd.Timestamp(end):
+                continue
+        files.append(os.path.join(path, stats["file"]))
+    if not files:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([pd.read_parquet(file, columns=columns) for file in files], ignore_index=True)
@@ -1,21 +1,67 @@
+import time
+
+# Startup phase timings, measured from the first import
+STARTED_AT = time.perf_counter()
+
 from flask import Flask, render_template, request, jsonify, send_file
 import pandas as pd
+import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import io
-import matplotlib.pyplot as plt
-import seaborn as sns
 from operator import attrgetter
+from collections import OrderedDict
+import functools
+import gzip
+import hashlib
+import hmac
 import os
+import queue
+import sys
+import threading
+import tracemalloc
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Unix only; peak RSS is not reported without it
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from aggregates import (
+    SUCCESS_STATUSES, RANKED_DIMENSIONS, build_aggregates, update_aggregates, ledger_frame,
+    top_k, customer_totals, cohort_frame, normalize_query, run_query, parse_query_date
+)
+from charts import chart_html, template_script
+from customers import (
+    LTV_METRICS, build_customer_index, update_customer_index, suggest_customers, resolve_customer,
+    build_ltv_tables, update_ltv_tables, top_customers
+)
+from partitions import build_partitions, update_partitions, select_labels, read_manifest, write_partitions, read_partitions
+import json
+from urllib.parse import urlencode
 
 app = Flask(__name__)
 
+# Sheet export to load; PAYMENTS_DATA_URL points it at another CSV path or URL
+DATA_URL = os.environ.get(
+    "PAYMENTS_DATA_URL",
+    "https://docs.google.com/spreadsheets/d/1FKPhjul2X1qDdfcv3EneYOT08FN7lBsUaIGTS_j238g/export?format=csv"
+)
+
+# Optional on-disk mirror of the processed data as month partitions
+PARTITION_DIR = os.environ.get("PAYMENTS_PARTITION_DIR")
+
 # Load and process data
 def load_and_process_data():
-    url = "https://docs.google.com/spreadsheets/d/1FKPhjul2X1qDdfcv3EneYOT08FN7lBsUaIGTS_j238g/export?format=csv"
-    df = pd.read_csv(url, on_bad_lines="skip")
+    df = pd.read_csv(DATA_URL, on_bad_lines="skip")
+    return process_payments(df)
 
+# Apply the dashboard's column cleanup, status mapping and category classification to raw sheet rows
+def process_payments(df):
     df["Description"] = df["Description"].astype(str)
     df["Adspends / Subscription"] = df["Description"].apply(
         lambda x: "Subscription" if "subscription" in x.lower() else "Adspends"
@@ -54,36 +100,448 @@ def load_and_process_data():
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], errors="coerce").dt.strftime("%d/%m/%Y")
 
+    # Month of each payment, shared by every monthly groupby
+    # Undated rows get the "NaT" month on every pandas version (pandas 3 would give NaN)
+    df["Month"] = pd.to_datetime(df["Created date"], format="%d/%m/%Y", errors="coerce").dt.to_period("M").astype(str).fillna("NaT")
+
     return df
 
-data = load_and_process_data()
+# Dispute index: only the disputed rows, with per-status/per-reason totals and the
+# evidence due dates kept sorted so deadline queries are a binary search
+def build_dispute_index(df):
+    disputed = df[df["Dispute Date (UTC)"].notna() | (df["Disputed Amount"] > 0)].copy()
+    disputed["Disputed Amount"] = disputed["Disputed Amount"].fillna(0)
+
+    by_status = disputed.groupby("Dispute Status").agg(
+        amount=("Disputed Amount", "sum"),
+        count=("Disputed Amount", "size")
+    )
+    by_reason = disputed.groupby("Dispute Reason").agg(
+        amount=("Disputed Amount", "sum"),
+        count=("Disputed Amount", "size")
+    ).sort_values(by="count", ascending=False)
+
+    due = pd.to_datetime(disputed["Dispute Evidence Due (UTC)"], format="%d/%m/%Y", errors="coerce")
+    due = due[due.notna()].sort_values(kind="stable")
+
+    return {
+        "rows": disputed,
+        "total_amount": disputed["Disputed Amount"].sum(),
+        "total_disputes": disputed["Dispute Date (UTC)"].count(),
+        "by_status": by_status,
+        "by_reason": by_reason,
+        "due_dates": due.values,
+        "due_labels": due.index.values
+    }
 
-def generate_pagination(current_page, total_pages, max_visible_pages=5):
-    pagination = []
-    ellipsis = "..."
-    if total_pages <= max_visible_pages + 2:
-        pagination = list(range(1, total_pages + 1))
+def disputes_due_between(index, start, end):
+    lo = np.searchsorted(index["due_dates"], np.datetime64(start), side="left")
+    hi = np.searchsorted(index["due_dates"], np.datetime64(end), side="right")
+    return index["rows"].loc[index["due_labels"][lo:hi]]
+
+def disputes_due_within(index, days, today=None):
+    today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.now().normalize()
+    return disputes_due_between(index, today, today + pd.Timedelta(days=days))
+
+# Content hash of the processed frame, used to key cached renderings and ETags
+def compute_data_version(df):
+    row_hashes = pd.util.hash_pandas_object(df, index=False).values
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
+def update_dispute_index(index, replaced_ids, batch):
+    rows = index["rows"]
+    rows = pd.concat([rows[~rows["PaymentIntent ID"].isin(replaced_ids)], batch], ignore_index=True)
+    return build_dispute_index(rows)
+
+# Start from the partition mirror when one exists, otherwise export the sheet and write it
+def load_initial_data():
+    if PARTITION_DIR and read_manifest(PARTITION_DIR):
+        return read_partitions(PARTITION_DIR), False
+    return load_and_process_data(), bool(PARTITION_DIR)
+
+# Data and everything derived from it are loaded by a background thread so the app
+# accepts health checks immediately; data routes answer 503 until /readyz is green.
+data = None
+partitions = {}
+data_version = ""
+dispute_index = None
+aggregates = None
+customer_index = None
+ltv_tables = None
+data_lock = threading.RLock()
+data_ready = threading.Event()
+startup_state = {"phase": "starting", "error": None, "attempts": 0, "timings": {"imports": round(time.perf_counter() - STARTED_AT, 4)}}
+startup_thread = None
+
+# A failed load is retried with exponential backoff; after the last attempt the phase is
+# "failed" and /healthz turns unhealthy so the platform restarts the worker
+LOAD_ATTEMPTS = int(os.environ.get("PAYMENTS_LOAD_ATTEMPTS", 5))
+LOAD_RETRY_SECONDS = 2
+LOAD_RETRY_MAX_SECONDS = 60
+
+def timed_phase(name, func, *args):
+    startup_state["phase"] = name
+    started = time.perf_counter()
+    result = func(*args)
+    startup_state["timings"][name] = round(time.perf_counter() - started, 4)
+    return result
+
+def load_data():
+    global data, partitions, data_version, dispute_index, aggregates, customer_index, ltv_tables
+    startup_state["attempts"] += 1
+    try:
+        loaded, write_mirror = timed_phase("load", load_initial_data)
+        loaded_partitions = timed_phase("partitions", build_partitions, loaded)
+        if write_mirror:
+            timed_phase("write_mirror", write_partitions, loaded, loaded_partitions, PARTITION_DIR)
+        version = timed_phase("data_version", compute_data_version, loaded)
+        loaded_disputes = timed_phase("dispute_index", build_dispute_index, loaded)
+        loaded_aggregates = timed_phase("aggregates", build_aggregates, loaded)
+        loaded_customers = timed_phase("customer_index", build_customer_index, loaded, loaded_aggregates["customers"])
+        loaded_ltv = timed_phase("ltv_tables", build_ltv_tables, loaded)
+    except Exception as e:
+        app.logger.exception("Failed to load payments data during phase %s (attempt %d)", startup_state["phase"], startup_state["attempts"])
+        startup_state["error"] = f"{startup_state['phase']}: {e}"
+        return False
+
+    with data_lock:
+        data, partitions, data_version = loaded, loaded_partitions, version
+        dispute_index, aggregates, customer_index, ltv_tables = loaded_disputes, loaded_aggregates, loaded_customers, loaded_ltv
+    startup_state["phase"] = "ready"
+    startup_state["error"] = None
+    startup_state["timings"]["total"] = round(time.perf_counter() - STARTED_AT, 4)
+    data_ready.set()
+    app.logger.info("Payments data ready: %s", startup_state["timings"])
+    return True
+
+def initialize_data():
+    delay = LOAD_RETRY_SECONDS
+    while not load_data():
+        if startup_state["attempts"] >= LOAD_ATTEMPTS:
+            startup_state["phase"] = "failed"
+            return
+        startup_state["phase"] = "retrying"
+        time.sleep(delay)
+        delay = min(delay * 2, LOAD_RETRY_MAX_SECONDS)
+
+def start_data_load():
+    global startup_thread
+    if startup_thread is None:
+        startup_thread = threading.Thread(target=initialize_data, name="data-load", daemon=True)
+        startup_thread.start()
+    return startup_thread
+
+start_data_load()
+
+# Rows created within [start, end], read only from the month partitions that overlap it
+def scoped_data(start=None, end=None):
+    with data_lock:
+        if start is None and end is None:
+            return data
+        return data.loc[select_labels(partitions, start, end)]
+
+# Fold a batch of new or changed processed payment rows into the data and every derived
+# structure. The batch must hold every current row of each PaymentIntent ID in it: all
+# existing rows of those IDs (and of any removed_ids) are retracted and replaced, so only
+# the affected months, countries, customers and cohort cells change.
+def apply_payment_batch(batch, removed_ids=()):
+    global data, data_version, dispute_index, customer_index, ltv_tables
+    with data_lock:
+        # New rows get fresh labels so partition label arrays stay valid
+        next_label = int(data.index.max()) + 1 if len(data) else 0
+        batch = batch.set_axis(pd.RangeIndex(next_label, next_label + len(batch)))
+
+        replaced_ids = set(batch["PaymentIntent ID"]) | set(removed_ids)
+        replaced = data["PaymentIntent ID"].isin(replaced_ids)
+        old_rows = data[replaced]
+
+        update_aggregates(aggregates, old_rows, batch)
+        dispute_index = update_dispute_index(dispute_index, replaced_ids, batch)
+        data = pd.concat([data[~replaced], batch])
+        customer_index = update_customer_index(customer_index, data, pd.concat([old_rows, batch]), aggregates["customers"])
+        ltv_tables = update_ltv_tables(ltv_tables, data, pd.concat([old_rows, batch]))
+        affected_months = update_partitions(partitions, old_rows, batch)
+        if PARTITION_DIR:
+            write_partitions(data, partitions, PARTITION_DIR, affected_months)
+
+        batch_version = compute_data_version(batch) if not batch.empty else ""
+        data_version = hashlib.sha1(f"{data_version}:{batch_version}:{sorted(removed_ids, key=str)}".encode()).hexdigest()[:16]
+        with response_cache_lock:
+            response_cache.clear()
+        with aggregate_cache_lock:
+            aggregate_cache.clear()
+        with table_cache_lock:
+            table_cache.clear()
+        version = data_version
+    publish_data_change(version, affected_months)
+    return {"replaced": int(len(old_rows)), "applied": int(len(batch)), "data_version": version}
+
+# Raw sheet columns, recovered from the processed frame by undoing the derived columns
+DERIVED_COLUMNS = ["Adspends / Subscription", "Gateway charges in USD", "Month"]
+
+def raw_columns(df):
+    return ["Created date (UTC)" if col == "Created date" else col for col in df.columns if col not in DERIVED_COLUMNS]
+
+# Payment events posted to /api/v1/ingest are buffered and committed in micro-batches
+INGEST_BATCH_SIZE = 500
+INGEST_FLUSH_SECONDS = 1.0
+# Above this many buffered events the endpoint answers 503 so senders back off
+INGEST_BUFFER_LIMIT = int(os.environ.get("PAYMENTS_INGEST_BUFFER_LIMIT", "50000"))
+INGEST_RETRY_AFTER_SECONDS = 5
+INGEST_REQUIRED_FIELDS = ["PaymentIntent ID", "Created date (UTC)", "Description", "Status", "Amount"]
+ingest_buffer = []
+# Batches that failed to commit, kept with their error for inspection and replay
+ingest_dead_letters = []
+ingest_condition = threading.Condition()
+ingest_stats = {"received": 0, "committed": 0, "batches": 0, "dead_lettered": 0, "last_commit_seconds": None, "last_commit_at": None, "last_error": None}
+ingest_thread = None
+
+def event_errors(event):
+    missing = [field for field in INGEST_REQUIRED_FIELDS if event.get(field) is None or str(event[field]).strip() == ""]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if pd.isna(pd.to_numeric(event["Amount"], errors="coerce")):
+        return f"Amount is not a number: {event['Amount']!r}"
+    return None
+
+def commit_ingest_batch(events):
+    raw = pd.DataFrame(events).drop_duplicates(subset="PaymentIntent ID", keep="last")
+    with data_lock:
+        columns = raw_columns(data)
+    batch = process_payments(raw.reindex(columns=columns))
+    return apply_payment_batch(batch)
+
+def run_ingest_committer():
+    # Events posted during startup stay buffered until the data has loaded
+    data_ready.wait()
+    while True:
+        with ingest_condition:
+            ingest_condition.wait_for(lambda: len(ingest_buffer) >= INGEST_BATCH_SIZE, timeout=INGEST_FLUSH_SECONDS)
+            events = ingest_buffer[:]
+            ingest_buffer.clear()
+        if not events:
+            continue
+
+        started = time.perf_counter()
+        try:
+            commit_ingest_batch(events)
+        except Exception as e:
+            app.logger.exception("Failed to commit %d ingested events", len(events))
+            with ingest_condition:
+                ingest_dead_letters.append({"events": events, "error": str(e), "failed_at": pd.Timestamp.now(tz="UTC").isoformat()})
+                ingest_stats["dead_lettered"] += len(events)
+            ingest_stats["last_error"] = str(e)
+            continue
+        ingest_stats["committed"] += len(events)
+        ingest_stats["batches"] += 1
+        ingest_stats["last_commit_seconds"] = round(time.perf_counter() - started, 4)
+        ingest_stats["last_commit_at"] = pd.Timestamp.now(tz="UTC").isoformat()
+
+def ensure_ingest_committer():
+    global ingest_thread
+    with ingest_condition:
+        if ingest_thread is None or not ingest_thread.is_alive():
+            ingest_thread = threading.Thread(target=run_ingest_committer, name="ingest-committer", daemon=True)
+            ingest_thread.start()
+
+# A row is keyed by its PaymentIntent ID, its content hash and its occurrence among
+# identical rows, so IDs shared by several rows and exact duplicates both diff correctly
+def row_keys(df):
+    keys = pd.DataFrame({
+        "id": df["PaymentIntent ID"].values,
+        "hash": pd.util.hash_pandas_object(df, index=False).values
+    })
+    keys["occurrence"] = keys.groupby(["id", "hash"], dropna=False).cumcount()
+    return keys
+
+# Re-export the sheet and apply only the payments with new, changed or removed rows. A
+# changed payment is sent with all of its fresh rows, as the batch replaces every row of an ID.
+def refresh_data():
+    fresh = load_and_process_data()
+    with data_lock:
+        current = data
+    diff = row_keys(fresh).merge(row_keys(current), how="outer", on=["id", "hash", "occurrence"], indicator=True)
+    changed_ids = set(diff.loc[diff["_merge"] != "both", "id"])
+    if not changed_ids:
+        # Nothing changed: keep the version, caches and client ETags as they are
+        return {"replaced": 0, "applied": 0, "data_version": data_version}
+    changed = fresh[fresh["PaymentIntent ID"].isin(changed_ids)]
+    removed_ids = changed_ids - set(fresh["PaymentIntent ID"])
+    return apply_payment_batch(changed, removed_ids)
+
+# Rendered pages keyed by data version, path and normalized filters. Each entry keeps
+# the body plus precompressed gzip/brotli variants so hits do no rendering or compression.
+RESPONSE_CACHE_SIZE = 64
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json", "text/csv"}
+response_cache = OrderedDict()
+response_cache_lock = threading.Lock()
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+def choose_encoding(available=("br", "gzip")):
+    accepted = request.accept_encodings
+    for encoding in available:
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted[encoding]:
+            return encoding
+    return None
+
+def normalized_request_key(extra=None):
+    args = sorted((key, value) for key, values in request.args.lists() for value in values)
+    return repr((data_version, request.path, args, extra))
+
+# Single-flight: concurrent callers asking for the same key wait on one in-progress
+# computation and share its result. Wait metrics are tracked per label (path and query).
+SINGLEFLIGHT_MAX_LABELS = 1000
+singleflight_calls = {}
+singleflight_stats = {}
+singleflight_lock = threading.Lock()
+
+def singleflight_label_stats(label):
+    if label not in singleflight_stats and len(singleflight_stats) >= SINGLEFLIGHT_MAX_LABELS:
+        label = "(other)"
+    return singleflight_stats.setdefault(label, {
+        "calls": 0, "executions": 0, "shared": 0, "in_flight": 0,
+        "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "compute_seconds_last": None
+    })
+
+def singleflight(key, compute, label=None):
+    with singleflight_lock:
+        call = singleflight_calls.get(key)
+        leader = call is None
+        if leader:
+            call = singleflight_calls[key] = {"done": threading.Event()}
+        stats = singleflight_label_stats(label if label is not None else str(key))
+        stats["calls"] += 1
+        stats["in_flight"] += 1
+
+    started = time.perf_counter()
+    if leader:
+        try:
+            call["result"] = compute()
+        except BaseException as e:
+            call["error"] = e
+        finally:
+            with singleflight_lock:
+                del singleflight_calls[key]
+                stats["executions"] += 1
+                stats["compute_seconds_last"] = round(time.perf_counter() - started, 4)
+            call["done"].set()
     else:
-        pagination.append(1)
-        if current_page > 3:
-            pagination.append(ellipsis)
-        start = max(2, current_page - 2)
-        end = min(total_pages - 1, current_page + 2)
-        pagination.extend(range(start, end + 1))
-        if current_page < total_pages - 2:
-            pagination.append(ellipsis)
-        pagination.append(total_pages)
-    return pagination
-
-def generate_category_chart(data, category):
-    category_data = data[data["Adspends / Subscription"] == category]
+        call["done"].wait()
+        waited = time.perf_counter() - started
+        with singleflight_lock:
+            stats["shared"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+    with singleflight_lock:
+        stats["in_flight"] -= 1
+    if "error" in call:
+        raise call["error"]
+    return call["result"]
+
+def current_day():
+    return pd.Timestamp.now().date().isoformat()
+
+def render_entry(key, view, args, kwargs):
+    response = app.make_response(view(*args, **kwargs))
+    if response.status_code != 200:
+        # Errors such as a 400 for bad filters are returned as-is and never cached
+        return {"response": response}
+    body = response.get_data()
+    entry = {"body": body, "gzip": compress_body(body, "gzip")}
+    if brotli is not None:
+        entry["br"] = compress_body(body, "br")
+    with response_cache_lock:
+        response_cache[key] = entry
+        while len(response_cache) > RESPONSE_CACHE_SIZE:
+            response_cache.popitem(last=False)
+    return entry
+
+def cached_page(key_func=None):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+            key = normalized_request_key(key_func() if key_func else None)
+            etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                with response_cache_lock:
+                    entry = response_cache.get(key)
+                    if entry is not None:
+                        response_cache.move_to_end(key)
+                if entry is None:
+                    entry = singleflight(key, lambda: render_entry(key, view, args, kwargs), label=request.full_path)
+                if "response" in entry:
+                    return entry["response"]
+
+                encoding = choose_encoding()
+                response = app.response_class(entry[encoding] if encoding else entry["body"], mimetype="text/html")
+                if encoding:
+                    response.headers["Content-Encoding"] = encoding
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+            response.vary.add("Accept-Encoding")
+            return response
+        return wrapper
+    return decorator
+
+# Results of /api/v1/aggregate keyed by data version and the normalized query
+AGGREGATE_CACHE_SIZE = 256
+aggregate_cache = OrderedDict()
+aggregate_cache_lock = threading.Lock()
+
+# Endpoints that work before the data has loaded; ingested events are buffered until then
+STARTUP_ENDPOINTS = {"healthz", "readyz", "static", "index", "chart_template", "ingest", "singleflight_metrics", "memory_metrics"}
+STARTUP_RETRY_SECONDS = 5
+
+@app.before_request
+def require_data():
+    if data_ready.is_set() or request.endpoint in STARTUP_ENDPOINTS:
+        return None
+    error = "Payments data failed to load" if startup_state["phase"] == "failed" else "Payments data is still loading"
+    response = jsonify({"error": error, "phase": startup_state["phase"], "last_error": startup_state["error"]})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(STARTUP_RETRY_SECONDS)
+    return response
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200 or response.status_code >= 300):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = choose_encoding()
+    if encoding:
+        response.set_data(compress_body(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+def generate_category_chart(ledger, category):
+    category_data = ledger[ledger["Adspends / Subscription"] == category]
+    category_data = category_data.assign(Paid=category_data["count"].where(category_data["Status"] == "Paid", 0))
     category_summary = category_data.groupby("Month").agg({
         "Converted Amount": "sum",
-        "Status": lambda x: (x == "Paid").sum(),
+        "Paid": "sum",
         "Converted Amount Refunded": "sum"
-    }).rename(columns={"Converted Amount": "Total Payment", "Status": "Successful Payments"})
+    }).rename(columns={"Converted Amount": "Total Payment", "Paid": "Successful Payments"})
     category_summary["Failed Payments"] = category_data[
-        (category_data["Status"] != "Paid") & (category_data["Status"] != "Refunded") & (data["Status"] != "Partial Refund")
+        ~category_data["Status"].isin(SUCCESS_STATUSES)
     ].groupby("Month")["Converted Amount"].sum()
     category_summary = category_summary.reset_index()
     return px.bar(
@@ -109,7 +567,15 @@ def generate_pie_chart(data, names_column, values_column, title):
         )
 
 
-def generate_line_chart(data, x, y, title, labels):
+# Most value labels drawn on a line chart; longer series label every n-th point
+LINE_CHART_MAX_LABELS = 40
+
+def label_step(n_points, max_labels):
+    if not max_labels or n_points <= max_labels:
+        return 1
+    return -(-n_points // max_labels)
+
+def generate_line_chart(data, x, y, title, labels, max_labels=LINE_CHART_MAX_LABELS):
     if title is None:
         chart = px.line(
         data,
@@ -128,31 +594,22 @@ def generate_line_chart(data, x, y, title, labels):
             labels=labels
         )
 
-    for i, row in data.iterrows():
-        chart.add_annotation(
-            x=row[x],
-            y=row[y],
-            text=f"${row[y]:,.2f}",
-            showarrow=False,
-            font=dict(size=10, color="black"),
-            bgcolor="white",
-            bordercolor="black",
-            borderwidth=1,
-            borderpad=4
-        )
+    # Value labels as one text layer on the trace rather than an annotation per point
+    step = label_step(len(data), max_labels)
+    text = [f"${value:,.2f}" if i % step == 0 or i == len(data) - 1 else "" for i, value in enumerate(data[y])]
+    chart.update_traces(
+        mode="lines+markers+text",
+        text=text,
+        textposition="top center",
+        textfont=dict(size=10, color="black")
+    )
+    chart.update_layout(meta={"max_labels": max_labels})
     return chart
 
 
-def perform_cohort_analysis(df):
-    # Convert subscription start to a datetime
-    df['Created date'] = pd.to_datetime(df['Created date'])
-
-    # Create columns for cohort and subscription month, and convert to period for grouping
-    df['sub_month'] = df['Created date'].dt.to_period('M')
-    df['cohort'] = df.groupby('Customer Email')['Created date'].transform('min').dt.to_period('M')
-
-    # Group data by cohort and subscription month, and count unique customers
-    df_cohort = df.groupby(['cohort', 'sub_month']).agg(n_customers=('Customer Email', 'nunique')).reset_index(drop=False)
+def build_cohort_tables(df_cohort):
+    if df_cohort.empty:
+        return "No cohort data available.", "No retention data available."
 
     # Calculate the period number (time passed since cohort start)
     df_cohort['period_number'] = (df_cohort.sub_month - df_cohort.cohort).apply(attrgetter('n'))
@@ -172,11 +629,190 @@ def perform_cohort_analysis(df):
 
     return cohort_pivot, retention_table
 
+# Headline numbers shown on /overview, computed from ledger rows
+def overview_metrics(ledger):
+    paid = ledger["Status"] == "Paid"
+    failed = ~ledger["Status"].isin(SUCCESS_STATUSES)
+    return {
+        "total_payment_value": float(ledger["Converted Amount"].sum()),
+        "total_success": float(ledger.loc[paid, "Converted Amount"].sum()),
+        "total_failed": float(ledger.loc[failed, "Converted Amount"].sum()),
+        "total_disputed_amount": float(ledger["Disputed Amount"].sum()),
+        "total_fee": float(ledger["Fee"].sum()),
+        "total_refunded": float(ledger["Converted Amount Refunded"].sum())
+    }
+
+def status_summary(ledger):
+    status_counts = ledger.groupby("Status")["count"].sum().sort_values(ascending=False).reset_index()
+    status_counts.columns = ["Status", "count"]  # Rename columns for clarity
+    status_amount = ledger.groupby("Status")["Converted Amount"].sum().reset_index()
+    status_amount.columns = ["Status", "Converted Amount"]  # Rename columns for clarity
+    return status_counts, status_amount
+
+# Server-Sent Events: each open dashboard holds a queue that receives the months touched
+# by every committed batch, and its stream turns that into a delta for its own source
+SSE_HEARTBEAT_SECONDS = 15
+SSE_QUEUE_SIZE = 100
+stream_subscribers = []
+stream_subscribers_lock = threading.Lock()
+
+def publish_data_change(version, months):
+    change = {"data_version": version, "months": sorted(months, key=str)}
+    with stream_subscribers_lock:
+        subscribers = list(stream_subscribers)
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(change)
+        except queue.Full:
+            # Slow client: collapse its backlog into one full resync
+            while not subscriber.empty():
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    break
+            subscriber.put_nowait({"data_version": version, "months": None})
+
+def overview_delta(source, months):
+    with data_lock:
+        ledger = ledger_frame(aggregates, None if source == 'All' else source)
+        version = data_version
+    monthly_revenue = ledger.groupby("Month")["Converted Amount"].sum()
+    if months is not None:
+        removed = [month for month in months if month not in monthly_revenue.index]
+        monthly_revenue = monthly_revenue[monthly_revenue.index.isin(months)]
+    else:
+        removed = []
+    status_counts, status_amount = status_summary(ledger)
+    return {
+        "data_version": version,
+        "full": months is None,
+        "metrics": overview_metrics(ledger),
+        "monthly_revenue": {
+            "x": monthly_revenue.index.tolist(),
+            "y": monthly_revenue.round(2).tolist(),
+            "removed": removed
+        },
+        "status_count": {"labels": status_counts["Status"].tolist(), "values": status_counts["count"].astype(int).tolist()},
+        "status_amount": {"labels": status_amount["Status"].tolist(), "values": status_amount["Converted Amount"].round(2).tolist()}
+    }
+
+def sse_event(name, payload):
+    return f"event: {name}\nid: {payload['data_version']}\ndata: {json.dumps(payload)}\n\n"
+
+def overview_stream(source):
+    # Subscribes when the response starts streaming and always unsubscribes on close. The
+    # first event is a full snapshot, so a client that connects or reconnects after missing
+    # deltas starts from current state; batches committed meanwhile follow as deltas.
+    subscriber = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+    with stream_subscribers_lock:
+        stream_subscribers.append(subscriber)
+    try:
+        yield "retry: 5000\n\n"
+        yield sse_event("snapshot", overview_delta(source, None))
+        while True:
+            try:
+                change = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_event("delta", overview_delta(source, change["months"]))
+    finally:
+        with stream_subscribers_lock:
+            stream_subscribers.remove(subscriber)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Bars shown in the country and decline reason charts before the rest becomes "Other"
+OVERVIEW_TOP_K = 15
+
+# Page data helpers: each returns the numbers and tables a page renders, so the views
+# and the static snapshot payloads (build_snapshots.py) always agree
+def overview_data(source='All'):
+    with data_lock:
+        ledger = ledger_frame(aggregates, None if source == 'All' else source)
+        countries = top_k(aggregates, "countries", OVERVIEW_TOP_K, None if source == 'All' else source)
+        declines = top_k(aggregates, "declines", OVERVIEW_TOP_K, None if source == 'All' else source)
+
+    paid = ledger["Status"] == "Paid"
+    failed = ~ledger["Status"].isin(SUCCESS_STATUSES)
+    status_counts, status_amount = status_summary(ledger)
+    monthly_summary = ledger.assign(
+        Successful=ledger["Converted Amount"].where(paid, 0),
+        Failed=ledger["Converted Amount"].where(failed, 0)
+    ).groupby("Month").agg(
+        Total_Payments=("Converted Amount", "sum"),
+        Total_Refunded=("Converted Amount Refunded", "sum"),
+        Total_Successful=("Successful", "sum"),
+        Total_Failed=("Failed", "sum")
+    ).reset_index()
+    return {
+        "ledger": ledger,
+        "metrics": overview_metrics(ledger),
+        "status_counts": status_counts,
+        "status_amount": status_amount,
+        "monthly_revenue": ledger.groupby("Month")["Converted Amount"].sum().reset_index(),
+        "monthly_summary": monthly_summary,
+        "countries": countries,
+        "declines": declines
+    }
+
+def cohorts_data():
+    with data_lock:
+        df_cohort = cohort_frame(aggregates)
+    df_cohort["cohort"] = pd.PeriodIndex(df_cohort["cohort"], freq="M")
+    df_cohort["sub_month"] = pd.PeriodIndex(df_cohort["sub_month"], freq="M")
+    cohort_table, retention_table = build_cohort_tables(df_cohort)
+
+    # Check if messages are returned instead of tables
+    if isinstance(cohort_table, str) and isinstance(retention_table, str):
+        return {"cohort_data": {}, "retention_data": {}, "cohort_message": cohort_table, "retention_message": retention_table}
+    return {
+        "cohort_data": cohort_table.fillna(0).astype(int).to_dict(orient='index'),
+        "retention_data": retention_table.fillna(0).round(2).to_dict(orient='index'),
+        "cohort_message": None,
+        "retention_message": None
+    }
+
+def refunds_data(date_start=None, date_end=None):
+    refund_data = scoped_data(date_start, date_end)
+    refunded = refund_data[refund_data["Converted Amount Refunded"] > 0]
+    return {
+        "total_refunded_amount": refund_data["Converted Amount Refunded"].sum(),
+        "total_refunds": refunded.shape[0],
+        "refund_trends": refunded.groupby("Created date")["Converted Amount Refunded"].sum().reset_index()
+    }
+
+def disputes_data(due_in=7):
+    with data_lock:
+        index = dispute_index
+    by_status = index["by_status"]
+
+    # Disputes whose evidence is due in the next `due_in` days
+    due_columns = ["PaymentIntent ID", "Customer Email", "Disputed Amount", "Dispute Reason", "Dispute Status", "Dispute Evidence Due (UTC)"]
+    due_disputes = disputes_due_within(index, due_in)
+    due_columns = [col for col in due_columns if col in due_disputes.columns]
+    return {
+        "total_disputed_amount": index["total_amount"],
+        "total_disputes": index["total_disputes"],
+        "total_disputed_amount_lost": by_status["amount"].get("lost", 0),
+        "total_disputed_amount_won": by_status["amount"].get("won", 0),
+        "by_reason": index["by_reason"],
+        "due_disputes": due_disputes[due_columns]
+    }
+
+def adspends_data():
+    category_summary = data.groupby("Adspends / Subscription").agg({
+        "Amount": "sum",
+        "Converted Amount Refunded": "sum",
+        "Gateway charges in USD": "sum"
+    }).reset_index()
+    revenue_trends = data.groupby(["Adspends / Subscription", "Created date"]).agg({"Amount": "sum"}).reset_index()
+    return {"category_summary": category_summary, "revenue_trends": revenue_trends}
+
 @app.route('/overview')
+@cached_page()
 def overview():
     # Get unique sources for the filter dropdown
     unique_sources = data['Source'].dropna().unique().tolist()
@@ -185,51 +821,21 @@ def overview():
     # Get the selected source from the request, default to "All"
     selected_source = request.args.get('source', 'All')
 
-    # Filter the data based on the selected source
-    if selected_source != 'All':
-        filtered_data = data[data['Source'] == selected_source]
-    else:
-        filtered_data = data
-
-    # Calculate metrics
-    total_payment_value = filtered_data["Converted Amount"].sum()
-    total_success = filtered_data[filtered_data["Status"] == "Paid"]["Converted Amount"].sum()
-    total_failed = filtered_data[(filtered_data["Status"] != "Paid") & 
-                                 (filtered_data["Status"] != "Refunded") & 
-                                 (filtered_data["Status"] != "Partial Refund")]["Converted Amount"].sum()
-    total_disputed_amount = filtered_data["Disputed Amount"].sum()
-    total_fee = filtered_data["Fee"].sum()
-    total_refunded = filtered_data["Converted Amount Refunded"].sum()
-
-    # Count the occurrences of each status
-    status_counts = filtered_data["Status"].value_counts().reset_index()
-    status_counts.columns = ["Status", "count"]  # Rename columns for clarity
+    page = overview_data(selected_source)
+    ledger, metrics = page["ledger"], page["metrics"]
+    status_counts, status_amount = page["status_counts"], page["status_amount"]
+    monthly_revenue, monthly_summary = page["monthly_revenue"], page["monthly_summary"]
+    countries, declines = page["countries"], page["declines"]
 
     # Generate pie chart for status counts
     pie_chart_count = generate_pie_chart(status_counts, "Status", "count",None)
 
-    # Sum the "Converted Amount" for each status
-    status_amount = filtered_data.groupby("Status")["Converted Amount"].sum().reset_index()
-    status_amount.columns = ["Status", "Converted Amount"]  # Rename columns for clarity
-
     # Generate pie chart for status amounts
     pie_chart_amount = generate_pie_chart(status_amount, "Status", "Converted Amount",None)
 
     # Monthly revenue analysis
-    filtered_data["Month"] = pd.to_datetime(filtered_data["Created date"], errors='coerce').dt.to_period("M").astype(str)
-    monthly_revenue = filtered_data.groupby("Month")["Converted Amount"].sum().reset_index()
     revenue_chart = generate_line_chart(monthly_revenue, "Month", "Converted Amount", None, {"Month": "Month", "Converted Amount": "Revenue"})
 
-    # Group by Month and aggregate
-    monthly_summary = filtered_data.groupby("Month").agg(
-        Total_Payments=("Converted Amount", "sum"),
-        Total_Refunded=("Converted Amount Refunded", "sum"),
-        Total_Successful=("Converted Amount", lambda x: x[filtered_data.loc[x.index, "Status"] == "Paid"].sum()),
-        Total_Failed=("Converted Amount", lambda x: x[(filtered_data.loc[x.index, "Status"] != "Paid") & 
-                                                      (filtered_data.loc[x.index, "Status"] != "Refunded") & 
-                                                      (filtered_data.loc[x.index, "Status"] != "Partial Refund")].sum())
-    ).reset_index()
-
     graph_data = monthly_summary.drop(columns=["Total_Payments"])
     melted_graph_data = graph_data.melt(id_vars=["Month"], var_name="Type", value_name="Amount")
     stacked_bar_chart = px.bar(melted_graph_data, x="Month", y="Amount", color="Type", barmode="stack")
@@ -238,37 +844,26 @@ def overview():
     normalized_chart = px.bar(melted_graph_data, x="Month", y="Percentage", color="Type", barmode="relative")
 
     # Additional category charts
-    adspends_chart = generate_category_chart(filtered_data, "Adspends")
-    subscription_chart = generate_category_chart(filtered_data, "Subscription")
-
-    # Country summary
-    country_summary = filtered_data.groupby("Card Address Country")["Converted Amount"].sum().reset_index().sort_values(by="Converted Amount", ascending=False)
-    country_chart = px.bar(country_summary, x="Card Address Country", y="Converted Amount")
+    adspends_chart = generate_category_chart(ledger, "Adspends")
+    subscription_chart = generate_category_chart(ledger, "Subscription")
 
-    # Failed reasons
-    failed_reasons = filtered_data[(filtered_data["Status"] != "Paid") & 
-                                   (filtered_data["Status"] != "Refunded") & 
-                                   (filtered_data["Status"] != "Partial Refund")]["Decline Reason"].value_counts().reset_index()
-    failed_reasons.columns = ["Decline Reason", "Count"]
-    failed_reason_chart = px.bar(failed_reasons, x="Decline Reason", y="Count")
+    # Top countries and decline reasons, the long tail folded into "Other"
+    country_chart = px.bar(countries, x="Card Address Country", y="Converted Amount", hover_data=["values"])
+    failed_reasons = declines.rename(columns={"count": "Count"})
+    failed_reason_chart = px.bar(failed_reasons, x="Decline Reason", y="Count", hover_data=["values"])
 
     return render_template(
         'overview.html',
-        total_payment_value=total_payment_value,
-        total_success=total_success,
-        total_failed=total_failed,
-        total_disputed_amount=total_disputed_amount,
-        total_fee=total_fee,
-        total_refunded=total_refunded,
-        pie_chart_count=pie_chart_count.to_html(full_html=False),
-        pie_chart_amount=pie_chart_amount.to_html(full_html=False),
-        revenue_chart=revenue_chart.to_html(full_html=False),
-        stacked_bar_chart=stacked_bar_chart.to_html(full_html=False),
-        normalized_chart=normalized_chart.to_html(full_html=False),
-        adspends_chart=adspends_chart.to_html(full_html=False),
-        subscription_chart=subscription_chart.to_html(full_html=False),
-        country_chart=country_chart.to_html(full_html=False),
-        failed_reason_chart=failed_reason_chart.to_html(full_html=False),
+        **metrics,
+        pie_chart_count=chart_html(pie_chart_count, div_id="pie-chart-count"),
+        pie_chart_amount=chart_html(pie_chart_amount, div_id="pie-chart-amount"),
+        revenue_chart=chart_html(revenue_chart, div_id="revenue-chart"),
+        stacked_bar_chart=chart_html(stacked_bar_chart),
+        normalized_chart=chart_html(normalized_chart),
+        adspends_chart=chart_html(adspends_chart),
+        subscription_chart=chart_html(subscription_chart),
+        country_chart=chart_html(country_chart),
+        failed_reason_chart=chart_html(failed_reason_chart),
         source_filter=selected_source,
         unique_sources=unique_sources,
         selected_source=selected_source
@@ -276,75 +871,184 @@ def overview():
 
 
 @app.route('/cohorts')
+@cached_page()
 def cohorts():
+    return render_template('cohorts.html', **cohorts_data())
+
+
+# Table endpoints: a filter and sort resolve to an array of frame labels, cached per
+# data version, and the grid fetches row windows of only the columns it shows as
+# columnar JSON ({"data": {column: [values...]}}).
+TABLE_WINDOW = 100
+TABLE_MAX_WINDOW = 1000
+TABLE_CACHE_SIZE = 128
+TABLE_DATE_COLUMNS = {"Created date", "Refunded date (UTC)", "Dispute Date (UTC)", "Dispute Evidence Due (UTC)"}
+TRANSACTION_COLUMNS = [
+    "PaymentIntent ID", "Created date", "Customer Email", "Amount", "Currency", "Converted Amount",
+    "Status", "Source", "Adspends / Subscription", "Card Address Country", "Decline Reason"
+]
+CUSTOMER_COLUMNS = [
+    "PaymentIntent ID", "Created date", "Description", "Amount", "Currency", "Converted Amount",
+    "Converted Amount Refunded", "Status", "Source", "Adspends / Subscription"
+]
+table_cache = OrderedDict()
+table_cache_lock = threading.Lock()
+
+def transaction_filters(values):
+    # Raises ValueError for an unparseable date
+    return {
+        "status": sorted(values.getlist("status")),
+        "source": sorted(values.getlist("source")),
+        "captured": values.get("captured") or "All",
+        "adspends": values.get("adspends") or "All",
+        "date_start": parse_query_date(values, "date_start"),
+        "date_end": parse_query_date(values, "date_end"),
+        "search_term": values.get("search_term") or None
+    }
 
-    cohort_data = {}
-    retention_data = {}
-    cohort_message = None
-    retention_message = None
-
-    cohort_table, retention_table = perform_cohort_analysis(data)
-
-    # Check if messages are returned instead of tables
-    if isinstance(cohort_table, str) and isinstance(retention_table, str):
-        cohort_message = cohort_table  # Assign the returned message
-        retention_message = retention_table
-    else:
-        cohort_message = None
-        retention_message = None
-        cohort_data = cohort_table.fillna(0).astype(int).to_dict(orient='index')
-        retention_data = retention_table.fillna(0).round(2).to_dict(orient='index')
-
-    return render_template(
-        'cohorts.html',
-        cohort_data=cohort_data,
-        retention_data=retention_data,
-        cohort_message=cohort_message,
-        retention_message=retention_message
-    )
+def filter_transactions(frame, filters):
+    if filters["date_start"] or filters["date_end"]:
+        with data_lock:
+            labels = select_labels(partitions, filters["date_start"], filters["date_end"])
+        # Intersect, as a batch may have been applied since the frame was taken
+        frame = frame.loc[frame.index.intersection(labels)]
+    if filters["status"]:
+        frame = frame[frame["Status"].isin(filters["status"])]
+    if filters["source"]:
+        frame = frame[frame["Source"].isin(filters["source"])]
+    if filters["captured"] == "Yes":
+        frame = frame[frame["Captured"] == True]
+    elif filters["captured"] == "No":
+        frame = frame[frame["Captured"] == False]
+    if filters["adspends"] != "All":
+        frame = frame[frame["Adspends / Subscription"] == filters["adspends"]]
+    if filters["search_term"]:
+        frame = frame[
+            frame["PaymentIntent ID"].str.contains(filters["search_term"], na=False, regex=False) |
+            frame["Customer ID"].str.contains(filters["search_term"], na=False, regex=False)
+        ]
+    return frame
+
+def table_sort(values, columns):
+    column = values.get("sort")
+    if column not in columns:
+        return None
+    return column, values.get("order", "asc") == "desc"
+
+def sort_frame(frame, sort):
+    if sort is None:
+        return frame
+    column, descending = sort
+    key = None
+    if column in TABLE_DATE_COLUMNS:
+        key = lambda values: pd.to_datetime(values, format="%d/%m/%Y", errors="coerce")
+    return frame.sort_values(by=column, ascending=not descending, kind="stable", key=key, na_position="last")
+
+def table_labels(name, params, select):
+    # Returns the current frame and the labels of its selected rows in display order
+    with data_lock:
+        frame, version = data, data_version
+    key = (version, name, json.dumps(params, sort_keys=True, default=str))
+    with table_cache_lock:
+        labels = table_cache.get(key)
+        if labels is not None:
+            table_cache.move_to_end(key)
+    if labels is None:
+        def compute():
+            result = select(frame).index.values
+            with table_cache_lock:
+                table_cache[key] = result
+                while len(table_cache) > TABLE_CACHE_SIZE:
+                    table_cache.popitem(last=False)
+            return result
+        labels = singleflight(("table",) + key, compute, label=f"table {name}")
+    return frame, labels
+
+def table_columns(values, available, default):
+    # columns=a,b or repeated columns=a&columns=b; the default set when absent
+    columns = [part.strip() for value in values.getlist("columns") for part in value.split(",") if part.strip()]
+    if not columns:
+        return [column for column in default if column in available]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
+def column_values(series):
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+def table_window(frame, labels, columns, offset=0, limit=TABLE_WINDOW):
+    offset = min(max(offset, 0), len(labels))
+    limit = min(max(limit, 1), TABLE_MAX_WINDOW)
+    rows = frame.loc[labels[offset:offset + limit], columns]
+    return {
+        "total": int(len(labels)),
+        "offset": offset,
+        "columns": columns,
+        "data": {column: column_values(rows[column]) for column in columns}
+    }
 
+def table_query(params):
+    return urlencode({key: value for key, value in params.items() if value not in (None, "All", [])}, doseq=True)
+
+def transaction_table(values):
+    filters = transaction_filters(values)
+    sort = table_sort(values, data.columns)
+    params = dict(filters, sort=sort)
+    frame, labels = table_labels("transactions", params, lambda frame: sort_frame(filter_transactions(frame, filters), sort))
+    return filters, sort, frame, labels
+
+def customer_table(values, email):
+    sort = table_sort(values, data.columns) or ("Created date", True)
+    params = {"email": email, "sort": sort}
+    return table_labels("customer", params, lambda frame: sort_frame(frame[frame["Customer Email"] == email], sort))
+
+def table_response(frame, labels, default_columns):
+    try:
+        columns = table_columns(request.args, frame.columns, default_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    window = table_window(frame, labels, columns, request.args.get("offset", 0, type=int), request.args.get("limit", TABLE_WINDOW, type=int))
+    return jsonify(window)
 
 @app.route('/customer-metrics', methods=['GET', 'POST'])
 def customer_metrics():
-    ROWS_PER_PAGE = 10
-    page = request.args.get('page', 1, type=int)
     email = request.args.get('email', '')
 
     if request.method == 'POST':
         email = request.form.get('email')
 
     if email:
-        customer_data = data[data['Customer Email'] == email]
+        # The lookup box takes an email or a Customer ID
+        email = resolve_customer(customer_index, email)
+        with data_lock:
+            totals = customer_totals(aggregates, email)
 
-        if not customer_data.empty:
-            customer_data = customer_data.sort_values(by='Created date', ascending=False)
+        if totals is not None:
             metrics = {
-                'total_payments': customer_data['Converted Amount'].sum(),
-                'total_successful_payments': customer_data[customer_data['Status'] == 'Paid']['Converted Amount'].sum(),
-                'total_adspend_transactions': customer_data[(customer_data['Adspends / Subscription'] == 'Adspends') & (customer_data['Status'] == 'Paid')].shape[0],
-                'total_subscription_transactions': customer_data[(customer_data['Adspends / Subscription'] == 'Subscription') & (customer_data['Status'] == 'Paid')].shape[0],
-                'total_refunds': customer_data['Converted Amount Refunded'].sum(),
-                'total_disputes': customer_data['Disputed Amount'].sum(),
-                'total_subscription': customer_data[(customer_data['Adspends / Subscription'] == 'Subscription') & (customer_data['Status'] == 'Paid')]['Converted Amount'].sum(),
-                'total_adspends': customer_data[(customer_data['Adspends / Subscription'] == 'Adspends') & (customer_data['Status'] == 'Paid')]['Converted Amount'].sum()
+                'total_payments': totals['Converted Amount'],
+                'total_successful_payments': totals['Successful Amount'],
+                'total_adspend_transactions': int(totals['Successful Adspends']),
+                'total_subscription_transactions': int(totals['Successful Subscriptions']),
+                'total_refunds': totals['Converted Amount Refunded'],
+                'total_disputes': totals['Disputed Amount'],
+                'total_subscription': totals['Successful Subscriptions Amount'],
+                'total_adspends': totals['Successful Adspends Amount']
             }
 
-            total_rows = customer_data.shape[0]
-            start_row = (page - 1) * ROWS_PER_PAGE
-            end_row = start_row + ROWS_PER_PAGE
-            paginated_data = customer_data.iloc[start_row:end_row]
-
-            customer_data_dict = {
-                "columns": list(customer_data.columns),
-                "data": paginated_data.values.tolist()
+            frame, labels = customer_table(request.args, email)
+            columns = [column for column in CUSTOMER_COLUMNS if column in frame.columns]
+            grid = {
+                "url": "/api/v1/customers/rows?" + urlencode({"email": email}),
+                "columns": columns,
+                "sort": ["Created date", True],
+                "initial": table_window(frame, labels, columns)
             }
 
             return render_template(
                 'customer_metrics.html',
                 metrics=metrics,
-                customer_data=customer_data_dict,
-                page=page,
-                total_pages=(total_rows + ROWS_PER_PAGE - 1) // ROWS_PER_PAGE,
+                grid=grid,
                 email=email
             )
         else:
@@ -352,138 +1056,462 @@ def customer_metrics():
 
     return render_template('customer_metrics.html')
 
+@app.route('/api/v1/customers/rows')
+def customer_rows():
+    email = request.args.get('email', '')
+    if not email:
+        return jsonify({"error": "email is required"}), 400
+    frame, labels = customer_table(request.args, email)
+    return table_response(frame, labels, CUSTOMER_COLUMNS)
+
+@app.route('/api/v1/customers/suggest')
+def customer_suggestions():
+    prefix = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    return jsonify(suggest_customers(customer_index, prefix, limit))
+
+def leaderboard_query():
+    metric = request.args.get('metric', 'successful_amount')
+    n = min(max(request.args.get('n', 10, type=int), 1), 500)
+    source = request.args.get('source') or None
+    category = request.args.get('category') or None
+    rows = top_customers(ltv_tables, metric, n, None if source == 'All' else source, None if category == 'All' else category)
+    return metric, n, source, category, rows
+
+def leaderboard_records(rows):
+    rows = rows.assign(
+        first_payment=rows["first_payment"].dt.strftime("%d/%m/%Y"),
+        last_payment=rows["last_payment"].dt.strftime("%d/%m/%Y")
+    ).round(2)
+    return rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+
+@app.route('/api/v1/leaderboard')
+def leaderboard_api():
+    try:
+        metric, n, source, category, rows = leaderboard_query()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"metric": metric, "n": n, "source": source, "category": category, "rows": leaderboard_records(rows)})
+
+@app.route('/leaderboard')
+def leaderboard():
+    try:
+        metric, n, source, category, rows = leaderboard_query()
+    except ValueError as e:
+        return render_template('leaderboard.html', error=str(e), metrics=LTV_METRICS, sources=[], categories=[])
+    records = leaderboard_records(rows)
+    return render_template(
+        'leaderboard.html',
+        metrics=LTV_METRICS,
+        selected_metric=metric,
+        n=n,
+        sources=sorted(data['Source'].dropna().unique().tolist()),
+        selected_source=source or 'All',
+        categories=["Adspends", "Subscription"],
+        selected_category=category or 'All',
+        columns=list(rows.columns),
+        rows=[list(record.values()) for record in records]
+    )
+
 @app.route('/transactions', methods=['GET', 'POST'])
 def transactions():
-    filtered_data = data.copy()
-    records_per_page = int(request.form.get("records_per_page", 10)) if request.method == 'POST' else 10
-    page = int(request.args.get("page", 1))
-
-    status_filter = []
-    source_filter = []
-    captured_filter = "All"
-    adspends_filter = "All"
-    date_range_start = None
-    date_range_end = None
-    search_term = None
-
-    status_options = data["Status"].dropna().unique().tolist()
-    source_options = data["Source"].dropna().unique().tolist()
-    captured_options = [True, False]
-
-    if request.method == 'POST':
-        status_filter = request.form.getlist('status')
-        source_filter = request.form.getlist('source')
-        captured_filter = request.form.get('captured')
-        adspends_filter = request.form.get('adspends')
-        date_range_start = request.form.get('date_start')
-        date_range_end = request.form.get('date_end')
-        search_term = request.form.get('search_term')
-
-        if status_filter:
-            filtered_data = filtered_data[filtered_data["Status"].isin(status_filter)]
-        if source_filter:
-            filtered_data = filtered_data[filtered_data["Source"].isin(source_filter)]
-        if captured_filter == "Yes":
-            filtered_data = filtered_data[filtered_data["Captured"] == True]
-        elif captured_filter == "No":
-            filtered_data = filtered_data[filtered_data["Captured"] == False]
-        if adspends_filter and adspends_filter != "All":
-            filtered_data = filtered_data[filtered_data["Adspends / Subscription"] == adspends_filter]
-        if date_range_start and date_range_end:
-            filtered_data = filtered_data[
-                (filtered_data["Created date"] >= pd.Timestamp(date_range_start)) &
-                (filtered_data["Created date"] <= pd.Timestamp(date_range_end))
-            ]
-        if search_term:
-            filtered_data = filtered_data[
-                filtered_data["PaymentIntent ID"].str.contains(search_term, na=False) |
-                filtered_data["Customer ID"].str.contains(search_term, na=False)
-            ]
-
-    total_records = len(filtered_data)
-    total_pages = (total_records + records_per_page - 1) // records_per_page
-    start = (page - 1) * records_per_page
-    end = start + records_per_page
-    paginated_data = filtered_data.iloc[start:end]
-
-    pagination = generate_pagination(page, total_pages)
-
-    transactions_data = {
-        "columns": list(filtered_data.columns),
-        "data": paginated_data.values.tolist(),
+    try:
+        filters, sort, frame, labels = transaction_table(request.values)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        columns = table_columns(request.values, frame.columns, TRANSACTION_COLUMNS)
+    except ValueError:
+        columns = [column for column in TRANSACTION_COLUMNS if column in frame.columns]
+
+    grid = {
+        "url": "/api/v1/transactions/rows?" + table_query(filters),
+        "columns": columns,
+        "sort": list(sort) if sort else None,
+        "initial": table_window(frame, labels, columns)
     }
 
     return render_template(
         'transactions.html',
-        transactions_data=transactions_data,
-        pagination=pagination,
-        current_page=page,
-        total_pages=total_pages,
-        total_records=total_records,
-        records_per_page=records_per_page,
-        status_options=status_options,
-        source_options=source_options,
-        captured_options=captured_options,
-        selected_status=status_filter,
-        selected_source=source_filter,
-        selected_captured=captured_filter,
+        grid=grid,
+        total_records=len(labels),
+        all_columns=list(frame.columns),
+        selected_columns=columns,
+        status_options=frame["Status"].dropna().unique().tolist(),
+        source_options=frame["Source"].dropna().unique().tolist(),
+        selected_status=filters["status"],
+        selected_source=filters["source"],
+        selected_captured=filters["captured"],
+        date_start=filters["date_start"],
+        date_end=filters["date_end"],
+        search_term=filters["search_term"]
     )
 
+@app.route('/api/v1/transactions/rows')
+def transaction_rows():
+    try:
+        _, _, frame, labels = transaction_table(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return table_response(frame, labels, TRANSACTION_COLUMNS)
+
 @app.route('/refunds')
+@cached_page()
 def refunds():
-    total_refunded_amount = data["Converted Amount Refunded"].sum()
-    total_refunds = data[data["Converted Amount Refunded"] > 0].shape[0]
-    refund_trends = data[data["Converted Amount Refunded"] > 0].groupby("Created date")["Converted Amount Refunded"].sum().reset_index()
-    refund_chart = px.line(refund_trends, x="Created date", y="Converted Amount Refunded", title="Refund Trends Over Time")
+    try:
+        date_start = parse_query_date(request.args, 'start')
+        date_end = parse_query_date(request.args, 'end')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    page = refunds_data(date_start, date_end)
+    refund_chart = px.line(page["refund_trends"], x="Created date", y="Converted Amount Refunded", title="Refund Trends Over Time")
     return render_template(
         'refunds.html',
-        total_refunded_amount=total_refunded_amount,
-        total_refunds=total_refunds,
-        refund_chart=refund_chart.to_html(full_html=False)
+        total_refunded_amount=page["total_refunded_amount"],
+        total_refunds=page["total_refunds"],
+        refund_chart=chart_html(refund_chart),
+        date_start=date_start,
+        date_end=date_end
     )
 
 @app.route('/disputes')
+@cached_page(current_day)
 def disputes():
-    total_disputed_amount = data["Disputed Amount"].sum()
-    total_disputes = data["Dispute Date (UTC)"].count()
-    total_disputed_amount_lost = data[(data["Disputed Amount"] > 0) & (data["Dispute Status"] == "lost")].sum()
-    total_disputed_amount_won = data[(data["Disputed Amount"] > 0) & (data["Dispute Status"] == "won")].sum()
-    dispute_reason_counts = data["Dispute Reason"].value_counts()
-    dispute_chart = px.bar(dispute_reason_counts, x=dispute_reason_counts.index, y=dispute_reason_counts.values, title="Dispute Reasons", labels={"x": "Reason", "y": "Count"})
+    due_in = request.args.get('due_in', 7, type=int)
+    page = disputes_data(due_in)
+    by_reason = page["by_reason"]
+    dispute_chart = px.bar(by_reason, x=by_reason.index, y="count", title="Dispute Reasons", labels={"x": "Reason", "count": "Count"})
+    due_disputes = page["due_disputes"]
+
     return render_template(
         'disputes.html',
-        total_disputed_amount=total_disputed_amount,
-        total_disputes=total_disputes,
-        total_disputed_amount_lost=total_disputed_amount_lost,
-        total_disputed_amount_won=total_disputed_amount_won,
-        dispute_chart=dispute_chart.to_html(full_html=False)
+        total_disputed_amount=page["total_disputed_amount"],
+        total_disputes=page["total_disputes"],
+        total_disputed_amount_lost=page["total_disputed_amount_lost"],
+        total_disputed_amount_won=page["total_disputed_amount_won"],
+        dispute_chart=chart_html(dispute_chart),
+        due_in=due_in,
+        due_disputes={
+            "columns": list(due_disputes.columns),
+            "data": due_disputes.values.tolist()
+        }
     )
 
 @app.route('/adspends-vs-subscriptions')
+@cached_page()
 def adspends_vs_subscriptions():
-    category_summary = data.groupby("Adspends / Subscription").agg({
-        "Amount": "sum",
-        "Converted Amount Refunded": "sum",
-        "Gateway charges in USD": "sum"
-    }).reset_index()
-    revenue_trends = data.groupby(["Adspends / Subscription", "Created date"]).agg({"Amount": "sum"}).reset_index()
+    page = adspends_data()
+    category_summary, revenue_trends = page["category_summary"], page["revenue_trends"]
     charts = {}
     for category in revenue_trends["Adspends / Subscription"].unique():
         category_data = revenue_trends[revenue_trends["Adspends / Subscription"] == category]
-        charts[category] = px.line(category_data, x="Created date", y="Amount", title=f"{category} Revenue Trend Over Time").to_html(full_html=False)
+        charts[category] = chart_html(px.line(category_data, x="Created date", y="Amount", title=f"{category} Revenue Trend Over Time"))
     return render_template(
         'adspends_vs_subscriptions.html',
         category_summary=category_summary.to_html(index=False),
         charts=charts
     )
 
+@app.route('/api/v1/aggregate', methods=['GET', 'POST'])
+def aggregate_api():
+    if request.method == 'POST':
+        spec = request.get_json(silent=True) or {}
+    else:
+        spec = {
+            "group_by": request.args.get("group_by"),
+            "metrics": request.args.get("metrics"),
+            "grain": request.args.get("grain"),
+            "start": request.args.get("start"),
+            "end": request.args.get("end"),
+            "filters": {key[len("filter."):]: request.args.getlist(key) for key in request.args if key.startswith("filter.")}
+        }
+    try:
+        query = normalize_query(spec, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with data_lock:
+        frame, version = scoped_data(query["start"], query["end"]), data_version
+    key = (version, json.dumps(query, sort_keys=True, default=str))
+    with aggregate_cache_lock:
+        rows = aggregate_cache.get(key)
+        if rows is not None:
+            aggregate_cache.move_to_end(key)
+    if rows is None:
+        def compute():
+            result = run_query(frame, query).to_dict(orient="records")
+            with aggregate_cache_lock:
+                aggregate_cache[key] = result
+                while len(aggregate_cache) > AGGREGATE_CACHE_SIZE:
+                    aggregate_cache.popitem(last=False)
+            return result
+        rows = singleflight(("aggregate",) + key, compute, label="/api/v1/aggregate " + key[1])
+
+    return jsonify({
+        "data_version": version,
+        "query": query,
+        "row_count": len(rows),
+        "rows": rows
+    })
+
+@app.route('/api/v1/top')
+def top_api():
+    dimension = request.args.get('dimension', 'countries')
+    if dimension not in RANKED_DIMENSIONS:
+        return jsonify({"error": f"Unknown dimension: {dimension} (choose from {', '.join(RANKED_DIMENSIONS)})"}), 400
+    k = min(max(request.args.get('k', OVERVIEW_TOP_K, type=int), 1), 100)
+    source = request.args.get('source') or None
+    category = request.args.get('category') or None
+    with data_lock:
+        rows = top_k(aggregates, dimension, k, None if source == 'All' else source, None if category == 'All' else category)
+        version = data_version
+    return jsonify({
+        "data_version": version,
+        "dimension": dimension,
+        "k": k,
+        "rows": rows.round(2).to_dict(orient="records")
+    })
+
+@app.route('/api/v1/ingest', methods=['GET', 'POST'])
+def ingest():
+    denied = write_denied()
+    if denied:
+        return denied
+    if request.method == 'GET':
+        with ingest_condition:
+            buffered = len(ingest_buffer)
+            dead_letters = len(ingest_dead_letters)
+        return jsonify(dict(ingest_stats, buffered=buffered, dead_letter_batches=dead_letters))
+
+    payload = request.get_json(silent=True)
+    events = payload.get("events") if isinstance(payload, dict) else payload
+    if not isinstance(events, list) or not all(isinstance(event, dict) for event in events):
+        return jsonify({"error": "Expected a JSON list of payment events or {\"events\": [...]}"}), 400
+    # One invalid event rejects the request, so a batch never fails later in the committer
+    invalid = {i: error for i, event in enumerate(events) if (error := event_errors(event))}
+    if invalid:
+        return jsonify({"error": f"{len(invalid)} invalid event(s)", "invalid": invalid}), 400
+
+    ensure_ingest_committer()
+    with ingest_condition:
+        if len(ingest_buffer) + len(events) > INGEST_BUFFER_LIMIT:
+            response = jsonify({"error": "Ingest buffer is full, retry later", "buffered": len(ingest_buffer)})
+            response.headers["Retry-After"] = str(INGEST_RETRY_AFTER_SECONDS)
+            return response, 503
+        ingest_buffer.extend(events)
+        ingest_stats["received"] += len(events)
+        buffered = len(ingest_buffer)
+        ingest_condition.notify()
+    return jsonify({"accepted": len(events), "buffered": buffered}), 202
+
+@app.route('/api/v1/overview/stream')
+def overview_stream_api():
+    response = app.response_class(overview_stream(request.args.get('source', 'All')), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route('/debug/singleflight')
+def singleflight_metrics():
+    with singleflight_lock:
+        stats = {label: dict(values) for label, values in singleflight_stats.items()}
+    for values in stats.values():
+        values["wait_seconds_mean"] = round(values["wait_seconds_total"] / values["shared"], 4) if values["shared"] else 0.0
+        values["wait_seconds_total"] = round(values["wait_seconds_total"], 4)
+        values["wait_seconds_max"] = round(values["wait_seconds_max"], 4)
+    return jsonify(stats)
+
+# /refresh and /api/v1/ingest change the data, so they are off unless PAYMENTS_WRITE_TOKEN
+# is set and then require it as "Authorization: Bearer <token>".
+app.config["WRITE_TOKEN"] = os.environ.get("PAYMENTS_WRITE_TOKEN") or None
+
+def write_denied():
+    token = app.config["WRITE_TOKEN"]
+    if not token:
+        return jsonify({"error": "Write endpoints are disabled; set PAYMENTS_WRITE_TOKEN to enable them"}), 404
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({"error": "Missing or invalid write token"}), 401
+    return None
+
+# Memory introspection: per-column bytes of the live frame, sizes of every derived
+# index and cache, and optionally the top allocation sites of one traced request.
+# Off unless PAYMENTS_DEBUG_MEMORY=1, as it exposes internals and tracing is process-wide.
+app.config["DEBUG_MEMORY"] = os.environ.get("PAYMENTS_DEBUG_MEMORY") == "1"
+MEMORY_TRACE_TOP = 25
+memory_trace_lock = threading.Lock()
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def object_bytes(obj, seen=None):
+    # Approximate deep size; numpy and pandas objects report their buffers
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return frame_bytes(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(object_bytes(item, seen) for item in obj.ravel())
+        return int(size)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(object_bytes(key, seen) + object_bytes(value, seen) for key, value in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(object_bytes(item, seen) for item in list(obj))
+    return size
+
+def frame_memory(df):
+    usage = df.memory_usage(index=True, deep=True)
+    columns = {
+        column: {"dtype": str(df[column].dtype), "bytes": int(usage[column])}
+        for column in df.columns
+    }
+    return {
+        "rows": len(df),
+        "bytes": int(usage.sum()),
+        "index_bytes": int(usage["Index"]),
+        "columns": dict(sorted(columns.items(), key=lambda item: -item[1]["bytes"]))
+    }
+
+def structure_memory():
+    with data_lock:
+        structures = {
+            "partitions": (partitions, len(partitions)),
+            "dispute_index": (dispute_index, len(dispute_index["rows"]) if dispute_index else 0),
+            "customer_index": (customer_index, len(customer_index["keys"]) if customer_index else 0),
+            "ltv_tables": (ltv_tables, sum(len(table) for table in ltv_tables.values()) if ltv_tables else 0)
+        }
+        for name, table in (aggregates or {}).items():
+            structures[f"aggregates.{name}"] = (table, len(table))
+    with response_cache_lock:
+        structures["response_cache"] = (list(response_cache.values()), len(response_cache))
+    with aggregate_cache_lock:
+        structures["aggregate_cache"] = (list(aggregate_cache.values()), len(aggregate_cache))
+    with table_cache_lock:
+        structures["table_cache"] = (list(table_cache.values()), len(table_cache))
+    with ingest_condition:
+        structures["ingest_buffer"] = (list(ingest_buffer), len(ingest_buffer))
+        structures["ingest_dead_letters"] = (list(ingest_dead_letters), len(ingest_dead_letters))
+    return {name: {"entries": entries, "bytes": object_bytes(value)} for name, (value, entries) in structures.items()}
+
+def process_memory():
+    # Peak RSS from getrusage (bytes on macOS, KB elsewhere); current RSS from /proc where available
+    memory = {"peak_rss_mb": None, "rss_mb": None}
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+def trace_request(path, top):
+    # tracemalloc is process-wide, so allocations of concurrent requests are included
+    with memory_trace_lock:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            started = time.perf_counter()
+            response = app.test_client().get(path)
+            elapsed = time.perf_counter() - started
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+    stats = after.compare_to(before, "lineno")
+    sites = sorted(stats, key=lambda stat: -abs(stat.size_diff))[:top]
+    return {
+        "path": path,
+        "status": response.status_code,
+        "seconds": round(elapsed, 4),
+        "peak_traced_bytes": peak,
+        "retained_bytes": sum(stat.size_diff for stat in stats),
+        "top_sites": [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size
+            }
+            for stat in sites
+        ]
+    }
+
+@app.route('/debug/memory')
+def memory_metrics():
+    if not app.config["DEBUG_MEMORY"]:
+        return jsonify({"error": "Memory introspection is disabled; set PAYMENTS_DEBUG_MEMORY=1 to enable it"}), 404
+    body = {"process": process_memory(), "frame": None, "structures": structure_memory()}
+    with data_lock:
+        frame = data
+    if frame is not None:
+        body["frame"] = frame_memory(frame)
+
+    path = request.args.get("trace")
+    if path:
+        if not path.startswith("/") or path.startswith("/debug/memory"):
+            return jsonify({"error": "trace must be an app path other than /debug/memory"}), 400
+        top = min(max(request.args.get("top", MEMORY_TRACE_TOP, type=int), 1), 200)
+        body["trace"] = trace_request(path, top)
+    return jsonify(body)
+
+@app.route('/chart-template.js')
+def chart_template():
+    response = app.response_class(template_script(), mimetype="application/javascript")
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return response
+
+@app.route('/healthz')
+def healthz():
+    # Unhealthy only once every load attempt has failed; loading and retrying are healthy
+    failed = startup_state["phase"] == "failed"
+    body = {"status": "failed" if failed else "ok", "uptime_seconds": round(time.perf_counter() - STARTED_AT, 4)}
+    if failed:
+        body["error"] = startup_state["error"]
+    return jsonify(body), 503 if failed else 200
+
+@app.route('/readyz')
+def readyz():
+    ready = data_ready.is_set()
+    body = {
+        "ready": ready,
+        "phase": startup_state["phase"],
+        "error": startup_state["error"],
+        "attempts": startup_state["attempts"],
+        "timings": startup_state["timings"],
+        "rows": len(data) if ready else None,
+        "data_version": data_version or None
+    }
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/refresh', methods=['POST'])
+def refresh():
+    denied = write_denied()
+    if denied:
+        return denied
+    return jsonify(refresh_data())
+
 @app.route('/export', methods=['POST'])
 def export_csv():
-    filtered_data = data.copy()
-    csv_buffer = io.StringIO()
-    filtered_data.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
-    return send_file(io.BytesIO(csv_buffer.getvalue().encode()), mimetype="text/csv", as_attachment=True, attachment_filename="filtered_data.csv")
+    with data_lock:
+        frame = data
+    csv_bytes = frame.to_csv(index=False).encode()
+    return send_file(io.BytesIO(csv_bytes), mimetype="text/csv", as_attachment=True, download_name="filtered_data.csv")
 
 
 if __name__ == "__main__":
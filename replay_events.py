@@ -0,0 +1,71 @@
+"""Replay payment rows as ingest events against a running dashboard.
+
+Stands in for the payment provider: reads rows in the sheet's export format (a CSV
+path or URL, defaulting to the dashboard's sheet) and POSTs them to /api/v1/ingest in
+batches at a fixed event rate, backing off while the server's buffer is full. The
+endpoint's write token is read from --token or PAYMENTS_WRITE_TOKEN.
+
+    python replay_events.py payments.csv --rate 200 --batch-size 50
+"""
+import argparse
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1FKPhjul2X1qDdfcv3EneYOT08FN7lBsUaIGTS_j238g/export?format=csv"
+
+
+def post_events(url, events, token=None):
+    body = json.dumps({"events": events}).encode()
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    while True:
+        req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(req) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise SystemExit(f"ingest failed with {e.code}: {e.read().decode()}")
+            time.sleep(float(e.headers.get("Retry-After", 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay payment rows to the ingest endpoint.")
+    parser.add_argument("source", nargs="?", default=SHEET_URL, help="CSV path or URL in the sheet export format (default: the dashboard sheet)")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/api/v1/ingest", help="ingest endpoint")
+    parser.add_argument("--rate", type=float, default=100.0, help="events per second")
+    parser.add_argument("--batch-size", type=int, default=50, help="events per request")
+    parser.add_argument("--limit", type=int, help="stop after this many events")
+    parser.add_argument("--token", default=os.environ.get("PAYMENTS_WRITE_TOKEN"), help="write token (default: PAYMENTS_WRITE_TOKEN)")
+    args = parser.parse_args()
+
+    rows = pd.read_csv(args.source, on_bad_lines="skip")
+    if args.limit:
+        rows = rows.head(args.limit)
+    events = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+
+    started = time.perf_counter()
+    sent = 0
+    for i in range(0, len(events), args.batch_size):
+        batch = events[i:i + args.batch_size]
+        result = post_events(args.url, batch, args.token)
+        sent += len(batch)
+        print(f"sent {sent}/{len(events)} (server buffered {result['buffered']})")
+
+        # Pace to the target rate
+        delay = started + sent / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {sent} events in {elapsed:.2f}s ({sent / elapsed if elapsed else 0:.1f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
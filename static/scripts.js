@@ -0,0 +1,274 @@
+// Live overview updates: apply the snapshot and delta events from /api/v1/overview/stream to the page
+
+function formatCurrency(value) {
+    return "$" + Number(value).toLocaleString("en-US", { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+}
+
+function applyMetrics(metrics) {
+    Object.entries(metrics).forEach(([name, value]) => {
+        const element = document.getElementById(`metric-${name}`);
+        if (element) {
+            element.textContent = formatCurrency(value);
+        }
+    });
+}
+
+function applyLinePoints(chartId, points, full) {
+    const chart = document.getElementById(chartId);
+    if (!chart || !chart.data) {
+        return;
+    }
+    const values = new Map();
+    const trace = chart.data[0];
+    // A full update replaces every point; a delta only the months it carries
+    if (!full) {
+        Array.from(trace.x).forEach((x, i) => values.set(String(x), trace.y[i]));
+    }
+    points.removed.forEach(x => values.delete(String(x)));
+    points.x.forEach((x, i) => values.set(String(x), points.y[i]));
+
+    const x = Array.from(values.keys()).sort();
+    const y = x.map(key => values.get(key));
+
+    // Same label density as generate_line_chart
+    const maxLabels = (chart.layout.meta || {}).max_labels;
+    const step = maxLabels && x.length > maxLabels ? Math.ceil(x.length / maxLabels) : 1;
+    const text = y.map((value, i) => (i % step === 0 || i === y.length - 1 ? formatCurrency(value) : ""));
+    Plotly.restyle(chart, { x: [x], y: [y], text: [text] }, [0]);
+}
+
+function applyPie(chartId, pie) {
+    const chart = document.getElementById(chartId);
+    if (chart && chart.data) {
+        Plotly.restyle(chart, { labels: [pie.labels], values: [pie.values] }, [0]);
+    }
+}
+
+function subscribeOverview(source) {
+    if (!window.EventSource) {
+        return null;
+    }
+    const stream = new EventSource(`/api/v1/overview/stream?source=${encodeURIComponent(source)}`);
+    const apply = event => {
+        const delta = JSON.parse(event.data);
+        applyMetrics(delta.metrics);
+        applyLinePoints("revenue-chart", delta.monthly_revenue, delta.full);
+        applyPie("pie-chart-count", delta.status_count);
+        applyPie("pie-chart-amount", delta.status_amount);
+    };
+    // Sent first on every (re)connect, so missed deltas never leave the page stale
+    stream.addEventListener("snapshot", apply);
+    stream.addEventListener("delta", apply);
+    return stream;
+}
+
+// Compact chart payloads (see charts.py): base64 typed arrays and dictionary-encoded strings
+
+const TYPED_ARRAYS = {
+    i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+    i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array
+};
+
+function decodeTypedArray(spec) {
+    const binary = atob(spec.bdata);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    let values = new TYPED_ARRAYS[spec.dtype](bytes.buffer);
+    if (spec.round !== undefined) {
+        // float32 on the wire, exact decimals in the browser
+        const scale = Math.pow(10, spec.round);
+        values = Float64Array.from(values, value => Math.round(value * scale) / scale);
+    }
+    if (!spec.shape) {
+        return values;
+    }
+    const [rows, columns] = String(spec.shape).split(",").map(Number);
+    return Array.from({ length: rows }, (_, row) => values.subarray(row * columns, (row + 1) * columns));
+}
+
+function decodeChartArrays(value) {
+    if (Array.isArray(value)) {
+        return value.map(decodeChartArrays);
+    }
+    if (value && typeof value === "object") {
+        if (typeof value.bdata === "string" && value.dtype) {
+            return decodeTypedArray(value);
+        }
+        if (Array.isArray(value.dict) && value.codes) {
+            return Array.from(decodeTypedArray(value.codes), code => value.dict[code]);
+        }
+        const decoded = {};
+        Object.keys(value).forEach(key => { decoded[key] = decodeChartArrays(value[key]); });
+        return decoded;
+    }
+    return value;
+}
+
+function renderChart(chartId, figure) {
+    const decoded = decodeChartArrays(figure);
+    if (typeof decoded.layout.template === "string") {
+        decoded.layout.template = (window.CHART_TEMPLATES || {})[decoded.layout.template];
+    }
+    Plotly.newPlot(chartId, decoded.data, decoded.layout, { responsive: true });
+}
+
+// Customer email typeahead backed by /api/v1/customers/suggest
+
+function attachCustomerTypeahead(inputId, listId, delay = 150) {
+    const input = document.getElementById(inputId);
+    const list = document.getElementById(listId);
+    if (!input || !list) {
+        return;
+    }
+    let timer = null;
+    let controller = null;
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const prefix = input.value.trim();
+            if (!prefix) {
+                list.replaceChildren();
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(`/api/v1/customers/suggest?q=${encodeURIComponent(prefix)}`, { signal: controller.signal })
+                .then(response => response.json())
+                .then(suggestions => {
+                    list.replaceChildren(...suggestions.map(suggestion => {
+                        const option = document.createElement("option");
+                        option.value = suggestion.email;
+                        option.label = `${suggestion.label} · ${formatCurrency(suggestion.volume)}`;
+                        return option;
+                    }));
+                })
+                .catch(() => {});
+        }, delay);
+    });
+}
+
+// Virtualized table: only the rows in view are in the DOM. Row windows of the shown
+// columns are fetched from a table endpoint as columnar JSON while scrolling.
+
+const GRID_ROW_HEIGHT = 33;
+const GRID_WINDOW = 100;
+const GRID_OVERSCAN = 10;
+const GRID_MAX_WINDOWS = 20;
+
+function formatCell(value) {
+    return value === null || value === undefined ? "" : String(value);
+}
+
+function createVirtualGrid(containerId, grid) {
+    const container = document.getElementById(containerId);
+    if (!container) {
+        return;
+    }
+    const state = { total: grid.initial.total, sort: grid.sort, windows: new Map(), pending: new Set(), generation: 0, frame: null };
+    state.windows.set(0, grid.initial.data);
+
+    const table = document.createElement("table");
+    table.className = "table table-bordered table-hover align-middle mb-0";
+    const head = table.createTHead();
+    head.className = "table-dark";
+    const headRow = head.insertRow();
+    const body = table.createTBody();
+    container.replaceChildren(table);
+
+    function renderHeader() {
+        headRow.replaceChildren(...grid.columns.map(column => {
+            const th = document.createElement("th");
+            th.scope = "col";
+            const arrow = state.sort && state.sort[0] === column ? (state.sort[1] ? " ▼" : " ▲") : "";
+            th.textContent = column + arrow;
+            th.addEventListener("click", () => sortBy(column));
+            return th;
+        }));
+    }
+
+    function spacer(height) {
+        const row = document.createElement("tr");
+        const cell = row.insertCell();
+        cell.colSpan = grid.columns.length;
+        cell.className = "p-0 border-0";
+        cell.style.height = `${height}px`;
+        return row;
+    }
+
+    function fetchWindow(index) {
+        if (state.windows.has(index) || state.pending.has(index)) {
+            return;
+        }
+        const generation = state.generation;
+        const params = new URLSearchParams({ offset: index * GRID_WINDOW, limit: GRID_WINDOW, columns: grid.columns.join(",") });
+        if (state.sort) {
+            params.set("sort", state.sort[0]);
+            params.set("order", state.sort[1] ? "desc" : "asc");
+        }
+        state.pending.add(index);
+        fetch(`${grid.url}${grid.url.includes("?") ? "&" : "?"}${params}`)
+            .then(response => response.json())
+            .then(result => {
+                if (generation !== state.generation) {
+                    return;
+                }
+                state.total = result.total;
+                state.windows.set(index, result.data);
+                // Drop the oldest windows once the cache is full
+                while (state.windows.size > GRID_MAX_WINDOWS) {
+                    state.windows.delete(state.windows.keys().next().value);
+                }
+                scheduleRender();
+            })
+            .catch(() => {})
+            .finally(() => state.pending.delete(index));
+    }
+
+    function render() {
+        state.frame = null;
+        const first = Math.max(0, Math.floor(container.scrollTop / GRID_ROW_HEIGHT) - GRID_OVERSCAN);
+        const visible = Math.ceil(container.clientHeight / GRID_ROW_HEIGHT) + 2 * GRID_OVERSCAN;
+        const last = Math.min(state.total, first + visible);
+
+        const rows = [spacer(first * GRID_ROW_HEIGHT)];
+        for (let i = first; i < last; i++) {
+            const data = state.windows.get(Math.floor(i / GRID_WINDOW));
+            const row = document.createElement("tr");
+            grid.columns.forEach(column => {
+                row.insertCell().textContent = data ? formatCell(data[column][i % GRID_WINDOW]) : "…";
+            });
+            if (!data) {
+                fetchWindow(Math.floor(i / GRID_WINDOW));
+            }
+            rows.push(row);
+        }
+        rows.push(spacer((state.total - last) * GRID_ROW_HEIGHT));
+        body.replaceChildren(...rows);
+    }
+
+    function scheduleRender() {
+        if (state.frame === null) {
+            state.frame = requestAnimationFrame(render);
+        }
+    }
+
+    function sortBy(column) {
+        const descending = state.sort && state.sort[0] === column ? !state.sort[1] : false;
+        state.sort = [column, descending];
+        state.generation += 1;
+        state.windows.clear();
+        state.pending.clear();
+        container.scrollTop = 0;
+        renderHeader();
+        render();
+    }
+
+    renderHeader();
+    render();
+    container.addEventListener("scroll", scheduleRender, { passive: true });
+    window.addEventListener("resize", scheduleRender);
+}
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loadtest import synthetic_payments
+
+# payments loads its data on import, so point it at a small synthetic sheet first
+DATA_DIR = tempfile.mkdtemp(prefix="payments-tests-")
+DATA_PATH = os.path.join(DATA_DIR, "payments.csv")
+os.environ["PAYMENTS_DATA_URL"] = DATA_PATH
+os.environ.pop("PAYMENTS_PARTITION_DIR", None)
+synthetic_payments(2000, seed=1).to_csv(DATA_PATH, index=False)
+
+
+@pytest.fixture(scope="session")
+def payments():
+    import payments
+    payments.startup_thread.join()
+    assert payments.data_ready.is_set(), payments.startup_state["error"]
+    return payments
+
+
+@pytest.fixture
+def sheet():
+    # Rewrites the sheet that refresh_data() re-exports
+    def write(df):
+        df.to_csv(DATA_PATH, index=False)
+    return write
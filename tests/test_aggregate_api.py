@@ -0,0 +1,32 @@
+def test_bad_dates_are_rejected(payments):
+    client = payments.app.test_client()
+    for query in ("start=yesterdayish", "end=2023-13-45"):
+        response = client.get("/api/v1/aggregate?" + query)
+        assert response.status_code == 400
+        assert "Invalid" in response.get_json()["error"]
+
+
+def test_query_string_filters_match_column_types(payments):
+    client = payments.app.test_client()
+    captured = int(payments.data["Captured"].sum())
+    for value in ("True", "true", "1"):
+        rows = client.get(f"/api/v1/aggregate?filter.Captured={value}").get_json()["rows"]
+        assert rows == [{"count": captured}]
+    assert client.get("/api/v1/aggregate?filter.Captured=maybe").status_code == 400
+
+
+def test_post_body_must_be_an_object(payments):
+    client = payments.app.test_client()
+    assert client.post("/api/v1/aggregate", json=["Source"]).status_code == 400
+    assert client.post("/api/v1/aggregate", json={"filters": ["Source"]}).status_code == 400
+
+
+
+def test_timezone_aware_dates_are_compared_in_utc(payments):
+    client = payments.app.test_client()
+    naive = client.get("/api/v1/aggregate?start=2024-01-01T00:00:00&end=2024-03-31").get_json()
+    for start in ("2024-01-01T00:00:00Z", "2024-01-01T02:00:00%2B02:00"):
+        aware = client.get(f"/api/v1/aggregate?start={start}&end=2024-03-31")
+        assert aware.status_code == 200
+        assert aware.get_json()["rows"] == naive["rows"]
+        assert aware.get_json()["query"]["start"] == "2024-01-01T00:00:00"
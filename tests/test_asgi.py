@@ -0,0 +1,37 @@
+import pytest
+
+from asgi import route_pool, wsgi_environ
+
+
+@pytest.mark.parametrize("path, query, pool", [
+    ("/overview", b"source=web", "heavy"),
+    ("/transactions", b"", "heavy"),
+    ("/transactions", b"search_term=pi_00", "heavy"),
+    ("/customer-metrics", b"email=a%40example.com", "heavy"),
+    ("/api/v1/leaderboard", b"metric=total_amount&n=500", "heavy"),
+    ("/api/v1/customers/rows", b"email=a%40example.com&offset=100", "heavy"),
+    ("/api/v1/transactions/rows", b"search_term=pi_00&offset=0", "heavy"),
+    ("/api/v1/transactions/rows", b"sort=Amount&order=desc", "heavy"),
+    ("/api/v1/transactions/rows", b"status=Paid&offset=100", "heavy"),
+    ("/api/v1/transactions/rows", b"offset=100&limit=100", "light"),
+    ("/api/v1/transactions/rows", b"captured=All&search_term=", "light"),
+    ("/api/v1/customers/suggest", b"q=cus", "light"),
+    ("/api/v1/top", b"dimension=countries", "light"),
+    ("/healthz", b"", "light"),
+    ("/api/v1/overview/stream", b"source=All", "stream"),
+])
+def test_route_pool(path, query, pool):
+    assert route_pool(path, query) == pool
+
+
+def test_repeated_headers_are_joined():
+    scope = {
+        "type": "http", "method": "GET", "path": "/overview", "query_string": b"",
+        "headers": [
+            (b"cookie", b"a=1"), (b"cookie", b"b=2"),
+            (b"accept", b"text/html"), (b"accept", b"application/json")
+        ]
+    }
+    environ = wsgi_environ(scope, b"")
+    assert environ["HTTP_COOKIE"] == "a=1; b=2"
+    assert environ["HTTP_ACCEPT"] == "text/html,application/json"
@@ -0,0 +1,28 @@
+import base64
+
+import numpy as np
+
+from charts import FLOAT32_LIMIT, _encode_numeric
+
+
+def browser_cents(encoded):
+    # Mirrors decodeTypedArray in static/scripts.js: Math.round(value * 100) / 100
+    values = np.frombuffer(base64.b64decode(encoded["bdata"]), dtype=np.dtype(encoded["dtype"]).newbyteorder("<"))
+    values = values.astype(np.float64)
+    if "round" in encoded:
+        return np.floor(values * 10 ** encoded["round"] + 0.5).astype(np.int64)
+    return np.round(values * 100).astype(np.int64)
+
+
+def test_cents_round_trip_below_the_float32_limit():
+    cents = np.arange(FLOAT32_LIMIT * 100 - 500_000, FLOAT32_LIMIT * 100, dtype=np.int64)
+    encoded = _encode_numeric(cents / 100)
+    assert encoded["dtype"] == "f4"
+    np.testing.assert_array_equal(browser_cents(encoded), cents)
+
+
+def test_values_at_the_limit_are_sent_as_float64():
+    cents = np.arange(FLOAT32_LIMIT * 100, FLOAT32_LIMIT * 100 + 500_000, dtype=np.int64)
+    encoded = _encode_numeric(cents / 100)
+    assert encoded["dtype"] == "f8"
+    np.testing.assert_array_equal(browser_cents(encoded), cents)
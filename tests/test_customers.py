@@ -0,0 +1,63 @@
+import numpy as np
+
+from customers import build_customer_index
+from loadtest import synthetic_payments
+
+
+def index_entries(index):
+    return sorted(zip(index["keys"], index["emails"], index["customer_ids"], np.round(index["volume"], 2)), key=str)
+
+
+def assert_index_order(index):
+    # Sorted by key, then by descending volume within a key
+    keys, volume = index["keys"], index["volume"]
+    assert all(keys[:-1] <= keys[1:])
+    same = keys[:-1] == keys[1:]
+    assert (volume[:-1][same] >= volume[1:][same]).all()
+
+
+def test_changed_email_leaves_no_stale_id_entry(payments, sheet):
+    raw = synthetic_payments(2000, seed=1)
+    sheet(raw)
+    payments.refresh_data()
+
+    # Move every payment of a few customers to a new email
+    moved = raw["Customer ID"].drop_duplicates().head(20)
+    rows = raw["Customer ID"].isin(moved)
+    raw.loc[rows, "Customer Email"] = raw.loc[rows, "Customer ID"] + "@moved.example.com"
+    sheet(raw)
+    payments.refresh_data()
+
+    rebuilt = build_customer_index(payments.data, payments.aggregates["customers"])
+    assert index_entries(payments.customer_index) == index_entries(rebuilt)
+    assert_index_order(payments.customer_index)
+    for customer_id in moved:
+        assert payments.resolve_customer(payments.customer_index, customer_id) == f"{customer_id}@moved.example.com"
+
+
+def test_lookup_accepts_a_customer_id(payments):
+    row = payments.data.iloc[-1]
+    client = payments.app.test_client()
+    by_id = client.post("/customer-metrics", data={"email": row["Customer ID"]})
+    assert by_id.status_code == 200
+    assert b"No data found" not in by_id.data
+    assert b'type="search"' in by_id.data
+
+
+def test_updates_merge_into_the_sorted_index(payments, sheet):
+    raw = synthetic_payments(2000, seed=1)
+    sheet(raw)
+    payments.refresh_data()
+
+    # New customers, changed amounts and a removed customer in one refresh
+    changed = raw.sample(50, random_state=2).index
+    raw.loc[changed, "Amount"] = raw.loc[changed, "Amount"] * 3
+    raw.loc[changed[:10], "Customer Email"] = [f"new{i}@example.com" for i in range(10)]
+    gone = raw["Customer Email"].iloc[-1]
+    sheet(raw[raw["Customer Email"] != gone])
+    payments.refresh_data()
+
+    rebuilt = build_customer_index(payments.data, payments.aggregates["customers"])
+    assert index_entries(payments.customer_index) == index_entries(rebuilt)
+    assert_index_order(payments.customer_index)
+    assert gone not in set(payments.customer_index["emails"])
@@ -0,0 +1,10 @@
+def test_memory_endpoint_is_off_by_default(payments):
+    assert payments.app.test_client().get("/debug/memory").status_code == 404
+
+
+def test_memory_endpoint_when_enabled(payments, monkeypatch):
+    monkeypatch.setitem(payments.app.config, "DEBUG_MEMORY", True)
+    body = payments.app.test_client().get("/debug/memory?trace=/cohorts").get_json()
+    assert body["frame"]["rows"] == len(payments.data)
+    assert body["trace"]["status"] == 200
+    assert body["process"]["peak_rss_mb"] > 0
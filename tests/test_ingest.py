@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from loadtest import synthetic_payments
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def client(payments, monkeypatch):
+    monkeypatch.setitem(payments.app.config, "WRITE_TOKEN", TOKEN)
+    return payments.app.test_client()
+
+
+def auth(token=TOKEN):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def events(n, seed=5):
+    raw = synthetic_payments(n, seed=seed)
+    raw["PaymentIntent ID"] = [f"pi_ingest_{seed}_{i}" for i in range(n)]
+    return raw.astype(object).where(raw.notna(), None).to_dict(orient="records")
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_write_endpoints_need_the_token(payments, monkeypatch):
+    client = payments.app.test_client()
+    monkeypatch.setitem(payments.app.config, "WRITE_TOKEN", None)
+    assert client.post("/refresh").status_code == 404
+    assert client.post("/api/v1/ingest", json=[]).status_code == 404
+
+    monkeypatch.setitem(payments.app.config, "WRITE_TOKEN", TOKEN)
+    assert client.post("/refresh").status_code == 401
+    assert client.post("/api/v1/ingest", json=[], headers=auth("wrong")).status_code == 401
+    assert client.get("/api/v1/ingest", headers=auth()).status_code == 200
+
+
+def test_invalid_events_are_rejected(client):
+    batch = events(3)
+    batch[1]["Description"] = None
+    batch[2]["Amount"] = "lots"
+    response = client.post("/api/v1/ingest", json=batch, headers=auth())
+    assert response.status_code == 400
+    assert set(response.get_json()["invalid"]) == {"1", "2"}
+    assert "Description" in response.get_json()["invalid"]["1"]
+
+
+def test_full_buffer_answers_503(payments, client, monkeypatch):
+    monkeypatch.setattr(payments, "INGEST_BUFFER_LIMIT", 2)
+    response = client.post("/api/v1/ingest", json=events(3), headers=auth())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+
+def test_ingested_events_are_committed(payments, client):
+    batch = events(5, seed=6)
+    response = client.post("/api/v1/ingest", json={"events": batch}, headers=auth())
+    assert response.status_code == 202
+    ids = {event["PaymentIntent ID"] for event in batch}
+    wait_for(lambda: ids <= set(payments.data["PaymentIntent ID"]))
+
+
+def test_failed_batches_go_to_dead_letters(payments, client, monkeypatch):
+    def fail(events):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(payments, "commit_ingest_batch", fail)
+    before = payments.ingest_stats["dead_lettered"]
+
+    batch = events(4, seed=7)
+    assert client.post("/api/v1/ingest", json=batch, headers=auth()).status_code == 202
+    wait_for(lambda: payments.ingest_stats["dead_lettered"] == before + 4)
+
+    letter = payments.ingest_dead_letters[-1]
+    assert letter["error"] == "boom"
+    assert [event["PaymentIntent ID"] for event in letter["events"]] == [event["PaymentIntent ID"] for event in batch]
+    stats = client.get("/api/v1/ingest", headers=auth()).get_json()
+    assert stats["dead_letter_batches"] >= 1
@@ -0,0 +1,24 @@
+import json
+
+
+def test_stream_starts_with_a_snapshot_and_unsubscribes_on_close(payments):
+    stream = payments.overview_stream("All")
+    assert payments.stream_subscribers == []
+
+    assert next(stream).startswith("retry:")
+    event = next(stream)
+    assert event.startswith("event: snapshot\n")
+    snapshot = json.loads(event.split("data: ", 1)[1])
+    assert snapshot["full"] is True
+    assert snapshot["data_version"] == payments.data_version
+    assert len(payments.stream_subscribers) == 1
+
+    stream.close()
+    assert payments.stream_subscribers == []
+
+
+def test_closing_the_response_unsubscribes(payments):
+    response = payments.app.test_client().get("/api/v1/overview/stream", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    response.close()
+    assert payments.stream_subscribers == []
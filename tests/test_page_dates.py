@@ -0,0 +1,8 @@
+def test_bad_page_dates_are_rejected(payments):
+    client = payments.app.test_client()
+    for url in ("/refunds?start=notadate", "/transactions?date_start=2023-13-45", "/api/v1/transactions/rows?date_end=soon"):
+        assert client.get(url).status_code == 400
+    # A rejected request is not cached in place of the page
+    assert client.get("/refunds?start=notadate").status_code == 400
+    assert client.get("/refunds?start=2023-03-01&end=2023-03-31").status_code == 200
+    assert client.get("/transactions?date_start=2023-03-01").status_code == 200
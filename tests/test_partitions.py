@@ -0,0 +1,36 @@
+import numpy as np
+
+from loadtest import synthetic_payments
+from partitions import build_partitions, read_partitions, update_partitions, write_partitions
+
+
+def undated_frame(payments):
+    raw = synthetic_payments(200, seed=3)
+    raw.loc[:9, "Created date (UTC)"] = ""
+    return payments.process_payments(raw)
+
+
+def test_mirror_round_trip_keeps_rows_without_a_date(payments, tmp_path):
+    df = undated_frame(payments)
+    partitions = build_partitions(df)
+    assert sum(partition["rows"] for partition in partitions.values()) == len(df)
+    assert partitions["NaT"]["rows"] == 10
+
+    write_partitions(df, partitions, str(tmp_path))
+    reloaded = read_partitions(str(tmp_path))
+    assert len(reloaded) == len(df)
+    assert sorted(reloaded["PaymentIntent ID"]) == sorted(df["PaymentIntent ID"])
+
+
+def test_update_moves_rows_out_of_the_undated_partition(payments):
+    df = undated_frame(payments)
+    partitions = build_partitions(df)
+    dated = df.loc[[0]].copy()
+    dated["Created date"] = "15/01/2024"
+    dated["Month"] = "2024-01"
+
+    affected = update_partitions(partitions, df.loc[[0]], dated)
+    assert affected == {"NaT", "2024-01"}
+    assert partitions["NaT"]["rows"] == 9
+    assert 0 in partitions["2024-01"]["labels"]
+    assert np.isin(0, partitions["NaT"]["labels"]).sum() == 0
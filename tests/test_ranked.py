@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from aggregates import ALL, OTHER, build_aggregates, top_k, update_aggregates
+from customers import build_ltv_tables, top_customers
+from loadtest import synthetic_payments
+
+
+@pytest.fixture
+def frame(payments):
+    return payments.process_payments(synthetic_payments(2000, seed=4))
+
+
+def test_top_countries_match_a_groupby(frame):
+    aggregates = build_aggregates(frame)
+    source = frame["Source"].dropna().iloc[0]
+    rows = frame[frame["Source"] == source]
+    expected = rows.groupby("Card Address Country")["Converted Amount"].sum().sort_values(ascending=False)
+
+    top = top_k(aggregates, "countries", 5, source=source)
+    assert top["Card Address Country"].tolist()[:5] == expected.index[:5].tolist()
+    np.testing.assert_allclose(top["Converted Amount"].iloc[:5], expected.iloc[:5])
+    other = top.iloc[-1]
+    assert other["Card Address Country"] == OTHER
+    assert other["values"] == len(expected) - 5
+    assert other["Converted Amount"] == pytest.approx(expected.iloc[5:].sum())
+
+
+def test_top_declines_rank_by_count(frame):
+    aggregates = build_aggregates(frame)
+    failed = frame[~frame["Status"].isin(["Paid", "Refunded", "Partial Refund"])]
+    expected = failed["Decline Reason"].value_counts()
+
+    top = top_k(aggregates, "declines", len(expected), category="Adspends").drop(columns="values")
+    adspends = failed[failed["Adspends / Subscription"] == "Adspends"]["Decline Reason"].value_counts()
+    assert dict(zip(top["Decline Reason"], top["count"])) == adspends.to_dict()
+    assert "Converted Amount" not in top.columns
+
+    top = top_k(aggregates, "declines", 3)
+    assert top["count"].tolist()[:3] == expected.iloc[:3].tolist()
+
+
+def test_retracting_every_row_drops_cells_and_slices(frame):
+    aggregates = build_aggregates(frame)
+    source = frame["Source"].dropna().iloc[0]
+    country = frame.loc[frame["Source"] != source, "Card Address Country"].dropna().iloc[0]
+
+    # Retract every payment of one source and of one more country
+    gone = frame[(frame["Source"] == source) | (frame["Card Address Country"] == country)]
+    update_aggregates(aggregates, gone, frame.iloc[0:0])
+
+    assert not any(key[0] == source for key in aggregates["countries"])
+    assert not any(key[0] == source for key in aggregates["declines"])
+    assert country not in aggregates["countries"][(ALL, ALL)]
+    assert top_k(aggregates, "countries", 5, source=source).empty
+
+    rebuilt = build_aggregates(frame.drop(index=gone.index))
+    assert aggregates["countries"].keys() == rebuilt["countries"].keys()
+    for key, cells in rebuilt["countries"].items():
+        assert cells.keys() == aggregates["countries"][key].keys()
+
+
+def test_leaderboard_ranks_customers_by_metric(frame):
+    tables = build_ltv_tables(frame)
+    paid = frame[frame["Customer Email"].notna() & (frame["Status"] == "Paid")]
+    expected = paid.groupby("Customer Email")["Converted Amount"].sum().sort_values(ascending=False)
+
+    top = top_customers(tables, "successful_amount", 5)
+    assert top["Customer Email"].tolist() == expected.index[:5].tolist()
+    np.testing.assert_allclose(top["successful_amount"], expected.iloc[:5])
+
+    source = frame["Source"].dropna().iloc[0]
+    rows = frame[frame["Customer Email"].notna() & (frame["Source"] == source)]
+    expected = rows.groupby("Customer Email").size().sort_values(ascending=False, kind="stable")
+    top = top_customers(tables, "transactions", 3, source=source)
+    assert top["transactions"].tolist() == expected.iloc[:3].tolist()
+    assert (top["Source"] == source).all()
+
+    with pytest.raises(ValueError):
+        top_customers(tables, "nope")
+
+
+def test_leaderboard_api(payments):
+    client = payments.app.test_client()
+    body = client.get("/api/v1/leaderboard?metric=total_amount&n=7").get_json()
+    amounts = [row["total_amount"] for row in body["rows"]]
+    assert len(amounts) == 7 and amounts == sorted(amounts, reverse=True)
+    assert client.get("/api/v1/leaderboard?metric=nope").status_code == 400
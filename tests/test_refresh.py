@@ -0,0 +1,82 @@
+import queue
+
+import pandas as pd
+
+from aggregates import build_aggregates, ledger_frame
+from loadtest import synthetic_payments
+
+
+def test_refresh_keeps_rows_sharing_a_payment_id(payments, sheet):
+    raw = synthetic_payments(2000, seed=1)
+    shared = raw.loc[0, "PaymentIntent ID"]
+    raw.loc[1, "PaymentIntent ID"] = shared
+    raw.loc[[0, 1], "Status"] = ["Failed", "Paid"]
+    sheet(raw)
+    payments.refresh_data()
+    assert len(payments.data) == 2000
+    assert sorted(payments.data.loc[payments.data["PaymentIntent ID"] == shared, "Status"]) == ["Failed", "Paid"]
+
+    # Only one of the two rows changes in the sheet
+    raw.loc[0, "Status"] = "Refunded"
+    sheet(raw)
+    result = payments.refresh_data()
+
+    assert result == {"replaced": 2, "applied": 2, "data_version": payments.data_version}
+    assert len(payments.data) == 2000
+    assert sorted(payments.data.loc[payments.data["PaymentIntent ID"] == shared, "Status"]) == ["Paid", "Refunded"]
+
+    rebuilt = ledger_frame(build_aggregates(payments.data))
+    ledger = ledger_frame(payments.aggregates)
+    keys = ["Source", "Adspends / Subscription", "Month", "Status"]
+    pd.testing.assert_frame_equal(
+        ledger.sort_values(keys).reset_index(drop=True),
+        rebuilt.sort_values(keys).reset_index(drop=True),
+        check_exact=False
+    )
+
+
+def test_refresh_drops_one_of_two_rows_sharing_an_id(payments, sheet):
+    raw = synthetic_payments(2000, seed=1)
+    shared = raw.loc[0, "PaymentIntent ID"]
+    raw.loc[1, "PaymentIntent ID"] = shared
+    sheet(raw)
+    payments.refresh_data()
+
+    sheet(raw.drop(index=1))
+    payments.refresh_data()
+
+    assert len(payments.data) == 1999
+    assert (payments.data["PaymentIntent ID"] == shared).sum() == 1
+
+
+def test_refresh_without_changes_keeps_version_and_caches(payments, sheet):
+    sheet(synthetic_payments(2000, seed=1))
+    payments.refresh_data()
+    client = payments.app.test_client()
+    etag = client.get("/cohorts").headers["ETag"]
+    version = payments.data_version
+
+    result = payments.refresh_data()
+
+    assert result == {"replaced": 0, "applied": 0, "data_version": version}
+    assert payments.data_version == version
+    assert len(payments.response_cache) > 0
+    assert client.get("/cohorts", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_refresh_with_undated_rows_publishes_a_nat_month(payments, sheet):
+    sheet(synthetic_payments(2000, seed=1))
+    payments.refresh_data()
+    subscriber = queue.Queue()
+    payments.stream_subscribers.append(subscriber)
+    try:
+        raw = synthetic_payments(2000, seed=1)
+        raw.loc[[0, 1], "Created date (UTC)"] = ""
+        sheet(raw)
+        payments.refresh_data()
+    finally:
+        payments.stream_subscribers.remove(subscriber)
+
+    assert (payments.data["Month"] == "NaT").sum() == 2
+    assert not payments.data["Month"].isna().any()
+    assert "NaT" in subscriber.get_nowait()["months"]
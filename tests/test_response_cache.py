@@ -0,0 +1,33 @@
+import gzip
+
+
+def test_matching_etag_gets_304(payments):
+    client = payments.app.test_client()
+    first = client.get("/cohorts")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    revalidated = client.get("/cohorts", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+    other = client.get("/cohorts?view=other", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_cached_page_is_served_precompressed(payments):
+    client = payments.app.test_client()
+    plain = client.get("/cohorts", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/cohorts", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+
+
+def test_etag_changes_with_the_data_version(payments, monkeypatch):
+    client = payments.app.test_client()
+    etag = client.get("/cohorts").headers["ETag"]
+    monkeypatch.setattr(payments, "data_version", "other-version")
+    assert client.get("/cohorts", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,65 @@
+import threading
+import time
+
+
+def run_concurrently(payments, key, compute, label, callers=5):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(payments.singleflight(key, compute, label=label))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    # Release the leader only once every caller has joined its flight
+    deadline = time.monotonic() + 5
+    while payments.singleflight_stats.get(label, {}).get("calls", 0) < callers:
+        assert time.monotonic() < deadline, "callers did not start"
+        time.sleep(0.01)
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_execution(payments):
+    release = threading.Event()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    threads, results, errors = run_concurrently(payments, ("test", "shared"), compute, "test shared")
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert executions == [1]
+    assert errors == []
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    stats = payments.singleflight_stats["test shared"]
+    assert (stats["calls"], stats["executions"], stats["shared"], stats["in_flight"]) == (5, 1, 4, 0)
+    assert ("test", "shared") not in payments.singleflight_calls
+
+    metrics = payments.app.test_client().get("/debug/singleflight").get_json()["test shared"]
+    assert metrics["shared"] == 4 and metrics["wait_seconds_mean"] >= 0
+
+
+def test_errors_reach_every_caller_and_are_not_cached(payments):
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, results, errors = run_concurrently(payments, ("test", "error"), fail, "test error", callers=3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [] and [str(e) for e in errors] == ["boom"] * 3
+    # The next call computes again
+    assert payments.singleflight(("test", "error"), lambda: "ok", label="test error") == "ok"
+    assert payments.singleflight_stats["test error"]["executions"] == 2
@@ -0,0 +1,48 @@
+import json
+import os
+import re
+import sys
+
+import build_snapshots
+
+
+def test_payloads_match_the_rendered_pages(payments):
+    client = payments.app.test_client()
+
+    refunds = build_snapshots.snapshot_payload(payments, "/refunds", {})
+    html = client.get("/refunds").get_data(as_text=True)
+    assert f"<p>${refunds['total_refunded_amount']}</p>" in html
+    assert f"<p>{refunds['total_refunds']}</p>" in html
+
+    disputes = build_snapshots.snapshot_payload(payments, "/disputes", {})
+    html = client.get("/disputes").get_data(as_text=True)
+    assert f"<p>${disputes['total_disputed_amount']}</p>" in html
+    assert f"<p>{disputes['total_disputes']}</p>" in html
+
+    overview = build_snapshots.snapshot_payload(payments, "/overview", {"source": "web"})
+    html = client.get("/overview?source=web").get_data(as_text=True)
+    for name, value in overview["metrics"].items():
+        assert re.search(rf'id="metric-{name}">\$' + re.escape(f"{value:,.2f}"), html)
+
+    adspends = build_snapshots.snapshot_payload(payments, "/adspends-vs-subscriptions", {})
+    html = client.get("/adspends-vs-subscriptions").get_data(as_text=True)
+    for row in adspends["category_summary"]:
+        assert f"<td>{row['Adspends / Subscription']}</td>" in html
+        assert f"<td>{row['Amount']}</td>" in html
+
+
+def test_snapshot_pages_link_copied_assets(payments, tmp_path, monkeypatch):
+    out = str(tmp_path / "snapshots")
+    monkeypatch.setattr(sys, "argv", ["build_snapshots.py", "--out", out, "--workers", "2"])
+    assert build_snapshots.main() == 0
+
+    manifest = json.load(open(os.path.join(out, "manifest.json")))
+    for page in manifest["pages"]:
+        path = os.path.join(out, page["path"])
+        html = open(path).read()
+        links = re.findall(r'(?:src|href)="([^"]+\.(?:js|css))"', html)
+        local = [link for link in links if not link.startswith("http")]
+        assert local and not any(link.startswith("/") for link in local)
+        for link in local:
+            assert os.path.exists(os.path.normpath(os.path.join(os.path.dirname(path), link)))
+        assert json.load(open(os.path.join(out, page["json_path"])))["data_version"] == payments.data_version
@@ -0,0 +1,37 @@
+def test_failed_load_is_retried(payments, monkeypatch):
+    frame = payments.data
+    calls = []
+
+    def flaky_load():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("sheet export timed out")
+        return frame, False
+
+    monkeypatch.setattr(payments, "load_initial_data", flaky_load)
+    monkeypatch.setattr(payments, "LOAD_RETRY_SECONDS", 0)
+    monkeypatch.setitem(payments.startup_state, "attempts", 0)
+    payments.initialize_data()
+
+    assert len(calls) == 3
+    assert payments.startup_state["phase"] == "ready"
+    assert payments.startup_state["error"] is None
+    assert payments.app.test_client().get("/healthz").status_code == 200
+
+
+def test_healthz_fails_after_the_last_attempt(payments, monkeypatch):
+    def failing_load():
+        raise OSError("sheet export timed out")
+
+    monkeypatch.setattr(payments, "load_initial_data", failing_load)
+    monkeypatch.setattr(payments, "LOAD_RETRY_SECONDS", 0)
+    monkeypatch.setattr(payments, "LOAD_ATTEMPTS", 2)
+    monkeypatch.setitem(payments.startup_state, "attempts", 0)
+    monkeypatch.setitem(payments.startup_state, "phase", "ready")
+    monkeypatch.setitem(payments.startup_state, "error", None)
+    payments.initialize_data()
+
+    assert payments.startup_state["attempts"] == 2
+    response = payments.app.test_client().get("/healthz")
+    assert response.status_code == 503
+    assert "timed out" in response.get_json()["error"]
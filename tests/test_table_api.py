@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from loadtest import synthetic_payments
+
+
+@pytest.fixture
+def client(payments, sheet):
+    sheet(synthetic_payments(2000, seed=1))
+    payments.refresh_data()
+    return payments.app.test_client()
+
+
+def values(series):
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+
+def test_window_of_a_sorted_filtered_table(payments, client):
+    response = client.get(
+        "/api/v1/transactions/rows?status=Paid&sort=Converted Amount&order=desc"
+        "&offset=10&limit=25&columns=PaymentIntent ID,Converted Amount"
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+
+    expected = payments.data[payments.data["Status"] == "Paid"].sort_values(
+        "Converted Amount", ascending=False, kind="stable", na_position="last"
+    )
+    assert body["total"] == len(expected)
+    assert body["offset"] == 10
+    assert body["columns"] == ["PaymentIntent ID", "Converted Amount"]
+    window = expected.iloc[10:35]
+    assert body["data"]["PaymentIntent ID"] == values(window["PaymentIntent ID"])
+    assert body["data"]["Converted Amount"] == values(window["Converted Amount"])
+
+
+def test_dates_sort_chronologically_and_filter_by_range(payments, client):
+    body = client.get(
+        "/api/v1/transactions/rows?sort=Created date&date_start=2024-02-01&date_end=2024-04-30"
+        "&columns=PaymentIntent ID&columns=Created date&limit=1000"
+    ).get_json()
+
+    created = pd.to_datetime(payments.data["Created date"], format="%d/%m/%Y", errors="coerce")
+    in_range = (created >= "2024-02-01") & (created <= "2024-04-30")
+    expected = payments.data[in_range].assign(created=created[in_range]).sort_values("created", kind="stable")
+    assert 0 < body["total"] == len(expected)
+    assert body["data"]["PaymentIntent ID"] == expected["PaymentIntent ID"].tolist()[:1000]
+
+
+def test_window_bounds_are_clamped(payments, client):
+    body = client.get("/api/v1/transactions/rows?limit=5000").get_json()
+    assert body["total"] == len(payments.data)
+    assert len(body["data"]["PaymentIntent ID"]) == payments.TABLE_MAX_WINDOW
+    assert body["columns"] == payments.TRANSACTION_COLUMNS
+
+    body = client.get(f"/api/v1/transactions/rows?offset={len(payments.data) + 50}").get_json()
+    assert body["offset"] == len(payments.data)
+    assert body["data"]["PaymentIntent ID"] == []
+
+
+def test_bad_columns_and_dates_are_rejected(client):
+    assert client.get("/api/v1/transactions/rows?columns=Nope").status_code == 400
+    assert client.get("/api/v1/transactions/rows?date_start=someday").status_code == 400
+    assert client.get("/api/v1/customers/rows").status_code == 400
+
+
+def test_customer_rows_default_to_newest_first(payments, client):
+    email = payments.data["Customer Email"].value_counts().index[0]
+    body = client.get(f"/api/v1/customers/rows?email={email}&columns=Created date").get_json()
+    assert body["total"] == (payments.data["Customer Email"] == email).sum()
+    dates = pd.to_datetime(pd.Series(body["data"]["Created date"]), format="%d/%m/%Y")
+    assert dates.dropna().is_monotonic_decreasing